@@ -0,0 +1,322 @@
+# load_test.py
+"""
+Load test of the API against the local stand-in LLM provider (LLM_BACKEND=fake).
+
+For every database backend a uvicorn server is started on a scratch
+database, seeded with users, listings and purchases, and each scenario is
+driven at a fixed concurrency for a fixed time. Throughput and p50/p95/p99
+latency are reported per backend and scenario.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 64 --duration 30 --latency fixed:0.05
+    python benchmarks/load_test.py --scenarios search,get_content --output results.json
+    python benchmarks/load_test.py --baseline results.json   # exit 1 on regressions
+
+Run from Backend/. The client shares the machine with the server, so compare
+numbers from the same host only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+API = "/api/v1"
+BACKENDS = {"memory": "False", "sqlite": "True"}
+# Seeding goes through the bulk API, enabled on the benchmark servers with this token
+BULK_API_TOKEN = secrets.token_urlsafe()
+WORDS = ("prompt", "story", "poem", "code", "python", "marketing", "email", "summary", "travel",
+         "recipe", "fitness", "essay", "translate", "sql", "resume", "pitch", "lyrics", "legal")
+
+
+class Fixtures:
+    """Ids seeded into the server, shared by the scenarios"""
+    def __init__(self, users: int, contents: int, owned_per_user: int, seed: int):
+        self.rng = random.Random(seed)
+        self.user_ids = [f"bench-user-{i}" for i in range(users)]
+        self.content_ids = [f"bench-content-{i}" for i in range(contents)]
+        self.owned: List[Tuple[str, str]] = [
+            (user_id, content_id)
+            for user_id in self.user_ids
+            for content_id in self.rng.sample(self.content_ids, min(owned_per_user, contents))
+        ]
+        self._query_no = 0
+
+    def query(self) -> str:
+        # Unique queries, so the response cache and request coalescing don't hide the provider path
+        self._query_no += 1
+        return f"{' '.join(self.rng.choices(WORDS, k=6))} #{self._query_no}"
+
+    def content_lines(self) -> bytes:
+        return "".join(json.dumps({
+            "id": content_id,
+            "title": f"{' '.join(self.rng.choices(WORDS, k=3))} {i}",
+            "description": " ".join(self.rng.choices(WORDS, k=40)),
+            "price": round(self.rng.uniform(0.5, 20), 2),
+            "metadata": {"tags": self.rng.sample(WORDS, 3)},
+        }) + "\n" for i, content_id in enumerate(self.content_ids)).encode()
+
+    def purchase_lines(self) -> bytes:
+        return "".join(
+            json.dumps({"user_id": user_id, "content_id": content_id}) + "\n" for user_id, content_id in self.owned
+        ).encode()
+
+
+# Scenario: one request against the server, returns the response. `ok` lists
+# the statuses that count as a success for it.
+Scenario = Callable[[httpx.AsyncClient, Fixtures], Awaitable[httpx.Response]]
+SCENARIOS: Dict[str, Tuple[Scenario, Tuple[int, ...]]] = {}
+
+
+def scenario(name: str, ok: Tuple[int, ...] = (200,)):
+    def register(fn: Scenario) -> Scenario:
+        SCENARIOS[name] = (fn, ok)
+        return fn
+    return register
+
+
+@scenario("get_content")
+async def get_content(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    return await client.get(f"{API}/content/get_content/{fixtures.rng.choice(fixtures.content_ids)}")
+
+
+@scenario("search")
+async def search(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    return await client.post(f"{API}/content/search", json={
+        "query": " ".join(fixtures.rng.sample(WORDS, 2)), "limit": 20
+    })
+
+
+@scenario("user_purchases")
+async def user_purchases(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    return await client.get(f"{API}/users/{fixtures.rng.choice(fixtures.user_ids)}/purchases")
+
+
+@scenario("purchase", ok=(200, 403))
+async def purchase(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    # Mostly new purchases at first, mostly "already purchased" once the pairs run out
+    return await client.post(f"{API}/content/purchase", json={
+        "user_id": fixtures.rng.choice(fixtures.user_ids), "content_id": fixtures.rng.choice(fixtures.content_ids)
+    })
+
+
+@scenario("test_chat")
+async def test_chat(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    user_id, content_id = fixtures.rng.choice(fixtures.owned)
+    return await client.post(f"{API}/content/test_chat_completion", json={
+        "query": fixtures.query(), "content_id": content_id, "user_id": user_id
+    })
+
+
+@scenario("test_chat_stream")
+async def test_chat_stream(client: httpx.AsyncClient, fixtures: Fixtures) -> httpx.Response:
+    user_id, content_id = fixtures.rng.choice(fixtures.owned)
+    async with client.stream("POST", f"{API}/content/test_chat_completion/stream", json={
+        "query": fixtures.query(), "content_id": content_id, "user_id": user_id
+    }) as response:
+        await response.aread()
+    return response
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+async def drive(client: httpx.AsyncClient, fixtures: Fixtures, name: str, concurrency: int,
+                duration: float, warmup: float) -> Dict:
+    """Run one scenario with `concurrency` requests always in flight"""
+    fn, ok = SCENARIOS[name]
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        while True:
+            sent = time.perf_counter()
+            if sent >= deadline:
+                return
+            try:
+                status = str((await fn(client, fixtures)).status_code)
+            except httpx.HTTPError as ex:
+                status = type(ex).__name__
+            if sent < measure_from:
+                continue
+            if status.isdigit() and int(status) in ok:
+                latencies.append(time.perf_counter() - sent)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    latencies.sort()
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(backend: str, workdir: str, args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        USE_SQLITE=BACKENDS[backend],
+        SQLITE_DB_PATH=os.path.join(workdir, "bench.db"),
+        LLM_BACKEND="fake",
+        FAKE_LLM_LATENCY=args.latency,
+        FAKE_LLM_ERROR_RATE=str(args.error_rate),
+        FAKE_LLM_SEED=str(args.seed),
+        # Measure the backend, not our own quotas or on-disk caches
+        PROVIDER_RATE_LIMITS="{}",
+        RESPONSE_CACHE_PATH="",
+        LOG_LEVEL="WARNING",
+        BULK_API_TOKEN=BULK_API_TOKEN,
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=SRC_DIR, env=env
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            if (await client.get("/healthcheck")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start in time")
+
+
+async def seed(client: httpx.AsyncClient, fixtures: Fixtures):
+    for user_id in fixtures.user_ids:
+        (await client.post(f"{API}/users/", json={"id": user_id, "username": user_id})).raise_for_status()
+    for path, body in (("content", fixtures.content_lines()), ("purchases", fixtures.purchase_lines())):
+        response = await client.post(f"{API}/bulk/{path}", content=body, timeout=120,
+                                     headers={"Authorization": f"Bearer {BULK_API_TOKEN}"})
+        response.raise_for_status()
+        if response.json()["failed"]:
+            raise RuntimeError(f"seeding {path} failed: {response.json()['errors'][:3]}")
+
+
+async def run_backend(backend: str, args: argparse.Namespace) -> Dict[str, Dict]:
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        server, base_url = start_server(backend, workdir, args)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                await wait_ready(client, server)
+                fixtures = Fixtures(args.users, args.contents, args.owned_per_user, args.seed)
+                await seed(client, fixtures)
+                results = {}
+                for name in args.scenarios:
+                    results[name] = await drive(client, fixtures, name, args.concurrency, args.duration, args.warmup)
+                    print_row(backend, name, results[name])
+                return results
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def print_row(backend: str, name: str, result: Optional[Dict] = None):
+    if result is None:
+        print(f"{'backend':<8} {'scenario':<18} {'requests':>9} {'errors':>7} {'req/s':>9} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        return
+    print(f"{backend:<8} {name:<18} {result['requests']:>9} {sum(result['errors'].values()):>7} "
+          f"{result['throughput']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}",
+          flush=True)
+
+
+def regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Scenarios that lost more than `tolerance` throughput or gained as much p99 latency"""
+    found = []
+    for backend, scenarios in results.items():
+        for name, result in scenarios.items():
+            before = baseline.get("results", {}).get(backend, {}).get(name)
+            if not before:
+                continue
+            if result["throughput"] < before["throughput"] * (1 - tolerance):
+                found.append(f"{backend}/{name}: throughput {before['throughput']} -> {result['throughput']} req/s")
+            if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+                found.append(f"{backend}/{name}: p99 {before['p99_ms']} -> {result['p99_ms']} ms")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the API against the fake LLM provider")
+    parser.add_argument("--backends", default="memory,sqlite", help=f"comma separated, of {sorted(BACKENDS)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated, of {list(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1, help="unmeasured seconds before each scenario")
+    parser.add_argument("--latency", default="lognormal:0.05,0.5", help="fake provider latency, see FAKE_LLM_LATENCY")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake provider error rate")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--contents", type=int, default=5000)
+    parser.add_argument("--owned-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression against the baseline")
+    args = parser.parse_args(argv)
+    args.backends = args.backends.split(",")
+    args.scenarios = args.scenarios.split(",")
+    for name in args.backends:
+        if name not in BACKENDS:
+            parser.error(f"unknown backend {name!r}")
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+
+    print_row("", "")
+    results = {backend: asyncio.run(run_backend(backend, args)) for backend in args.backends}
+    report = {
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# cli.py
+"""
+Bulk import / export of the marketplace database as NDJSON.
+
+    python cli.py import content listings.ndjson
+    python cli.py export purchases purchases.ndjson
+    cat listings.ndjson | python cli.py import content -
+
+Works on the database configured in .env, meant for USE_SQLITE=True (the
+in-memory database only lives as long as the process).
+"""
+import argparse
+import contextlib
+import json
+import sys
+from typing import BinaryIO
+
+from constants import BULK_CHUNK_SIZE, USE_SQLITE
+from database.db import create_database
+from impl import setup_logging
+from models.schemas import Content, Purchase
+from services.bulk import NDJSONImport, to_ndjson
+
+# table -> (record model, bulk insert method, batch iterator method)
+TABLES = {
+    "content": (Content, "bulk_add_content", "iter_content"),
+    "purchases": (Purchase, "bulk_add_purchases", "iter_purchases"),
+}
+
+
+def import_ndjson(backend, table: str, source: BinaryIO, chunk_size: int = BULK_CHUNK_SIZE) -> dict:
+    model, insert, _ = TABLES[table]
+    write = getattr(backend, insert)
+    importer = NDJSONImport(model, chunk_size)
+
+    def flush(batch):
+        if not batch:
+            return
+        try:
+            importer.written(write(batch))
+        except Exception as ex:
+            importer.rejected(batch, ex)
+        print(f"* {importer.imported} {table} imported", file=sys.stderr)
+
+    for line in source:
+        flush(importer.feed(line))
+    flush(importer.finish())
+    return importer.report()
+
+
+def export_ndjson(backend, table: str, out: BinaryIO, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    _, _, iterate = TABLES[table]
+    exported = 0
+    for batch in getattr(backend, iterate)(chunk_size):
+        out.write(to_ndjson(batch))
+        exported += len(batch)
+    out.flush()
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import / export of content and purchases as NDJSON")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", nargs="?", default="-", help="NDJSON file, - for stdin / stdout")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args(argv)
+    # Logs go to stderr, exports to stdout stay clean
+    setup_logging()
+
+    if not USE_SQLITE:
+        print("* Warning: USE_SQLITE is off, the in-memory database is discarded on exit", file=sys.stderr)
+
+    backend = create_database()
+
+    try:
+        if args.command == "import":
+            with (open(args.path, "rb") if args.path != "-" else contextlib.nullcontext(sys.stdin.buffer)) as source:
+                report = import_ndjson(backend, args.table, source, args.chunk_size)
+            print(json.dumps(report), file=sys.stderr)
+            return 1 if report["failed"] else 0
+
+        with (open(args.path, "wb") if args.path != "-" else contextlib.nullcontext(sys.stdout.buffer)) as out:
+            exported = export_ndjson(backend, args.table, out, args.chunk_size)
+        print(f"* {exported} {args.table} exported", file=sys.stderr)
+        return 0
+    finally:
+        close = getattr(backend, "close", None)
+        if close is not None:
+            close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,10 +19,92 @@ class Config:
             default_config = {
                 "WHITELIST_URL": os.environ.get("WHITELIST_URL", "*"),
                 "PORT": os.environ.get("PORT", 8000),
+                "HOST": os.environ.get("HOST", "0.0.0.0"),
+                "WORKERS": os.environ.get("WORKERS", 1),
+                "UVICORN_LOOP": os.environ.get("UVICORN_LOOP", "auto"),
+                "UVICORN_HTTP": os.environ.get("UVICORN_HTTP", "auto"),
+                "GRACEFUL_SHUTDOWN_TIMEOUT": os.environ.get("GRACEFUL_SHUTDOWN_TIMEOUT", 30),
+                "KEEPALIVE_TIMEOUT": os.environ.get("KEEPALIVE_TIMEOUT", 5),
+                "ACCESS_LOG": os.environ.get("ACCESS_LOG", "False").lower() in ('true', '1', 't'),
+                "RELOAD": os.environ.get("RELOAD", "False").lower() in ('true', '1', 't'),
+                "SHARED_DB_DIR": os.environ.get("SHARED_DB_DIR", "/dev/shm"),
                 "DEFAULT_LLM_MODEL": os.environ.get("DEFAULT_LLM_MODEL", "gpt-3.5-turbo"),
                 "USE_SQLITE": os.environ.get("USE_SQLITE", "False").lower() in ('true', '1', 't'),
                 "SQLITE_DB_PATH": os.environ.get('SQLITE_DB_PATH', 'prompt_market.db'),
+                "SQLITE_SYNCHRONOUS": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+                "SQLITE_CACHE_SIZE_KB": os.environ.get("SQLITE_CACHE_SIZE_KB", 64000),
+                "SQLITE_MMAP_SIZE": os.environ.get("SQLITE_MMAP_SIZE", 268435456),
+                "SQLITE_BUSY_TIMEOUT_MS": os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000),
+                "SQLITE_STATEMENT_CACHE_SIZE": os.environ.get("SQLITE_STATEMENT_CACHE_SIZE", 256),
+                "PURCHASES_DEFAULT_LIMIT": os.environ.get("PURCHASES_DEFAULT_LIMIT", 100),
+                "PURCHASES_MAX_LIMIT": os.environ.get("PURCHASES_MAX_LIMIT", 1000),
+                "BULK_CHUNK_SIZE": os.environ.get("BULK_CHUNK_SIZE", 5000),
+                "BULK_MAX_ERRORS": os.environ.get("BULK_MAX_ERRORS", 100),
+                "BULK_API_TOKEN": os.environ.get("BULK_API_TOKEN", ""),
+                "TEST_RESULTS_RETENTION": os.environ.get("TEST_RESULTS_RETENTION", 100),
+                "TEST_RESULTS_DEFAULT_LIMIT": os.environ.get("TEST_RESULTS_DEFAULT_LIMIT", 20),
+                "TEST_RESULTS_MAX_LIMIT": os.environ.get("TEST_RESULTS_MAX_LIMIT", 100),
+                "DB_EXECUTOR_WORKERS": os.environ.get("DB_EXECUTOR_WORKERS", 8),
+                "DB_MAX_QUEUE": os.environ.get("DB_MAX_QUEUE", 256),
+                "CONTENT_CACHE_SIZE": os.environ.get("CONTENT_CACHE_SIZE", 10000),
+                "CONTENT_CACHE_MAX_BYTES": os.environ.get("CONTENT_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                "CONTENT_CACHE_TTL": os.environ.get("CONTENT_CACHE_TTL", 60),
+                "MODEL_ALIASES": os.environ.get("MODEL_ALIASES", "{}"),
+                "MODEL_MAX_TOKENS": os.environ.get("MODEL_MAX_TOKENS", "{}"),
+                "MODEL_CATALOG_CACHE_PATH": os.environ.get("MODEL_CATALOG_CACHE_PATH", "model_catalog.json"),
+                "MODEL_CATALOG_REFRESH_SECONDS": os.environ.get("MODEL_CATALOG_REFRESH_SECONDS", 900),
+                "ATOMA_MAX_CONNECTIONS": os.environ.get("ATOMA_MAX_CONNECTIONS", 100),
+                "ATOMA_MAX_KEEPALIVE_CONNECTIONS": os.environ.get("ATOMA_MAX_KEEPALIVE_CONNECTIONS", 20),
+                "ATOMA_KEEPALIVE_EXPIRY": os.environ.get("ATOMA_KEEPALIVE_EXPIRY", 60),
+                "ATOMA_TIMEOUT": os.environ.get("ATOMA_TIMEOUT", 120),
+                "ATOMA_CONNECT_TIMEOUT": os.environ.get("ATOMA_CONNECT_TIMEOUT", 10),
+                "ATOMA_MAX_CONCURRENCY": os.environ.get("ATOMA_MAX_CONCURRENCY", 16),
+                "OPENAI_MAX_CONCURRENCY": os.environ.get("OPENAI_MAX_CONCURRENCY", 32),
+                "BATCH_MAX_QUERIES": os.environ.get("BATCH_MAX_QUERIES", 100),
+                "PROVIDER_RATE_LIMITS": os.environ.get(
+                    "PROVIDER_RATE_LIMITS",
+                    '{"openai": {"rpm": 500, "tpm": 200000}, "atoma": {"rpm": 600, "tpm": 1000000}}'
+                ),
+                "MODEL_RATE_LIMITS": os.environ.get("MODEL_RATE_LIMITS", "{}"),
+                "RATE_LIMIT_MAX_WAIT": os.environ.get("RATE_LIMIT_MAX_WAIT", 10),
+                "RATE_LIMIT_MAX_QUEUE": os.environ.get("RATE_LIMIT_MAX_QUEUE", 256),
+                "RATE_LIMIT_MAX_RETRIES": os.environ.get("RATE_LIMIT_MAX_RETRIES", 2),
+                "RATE_LIMIT_BACKOFF_BASE": os.environ.get("RATE_LIMIT_BACKOFF_BASE", 1),
+                "RATE_LIMIT_BACKOFF_MAX": os.environ.get("RATE_LIMIT_BACKOFF_MAX", 60),
+                "LATENCY_WINDOW": os.environ.get("LATENCY_WINDOW", 200),
+                "CIRCUIT_WINDOW": os.environ.get("CIRCUIT_WINDOW", 50),
+                "CIRCUIT_MIN_CALLS": os.environ.get("CIRCUIT_MIN_CALLS", 10),
+                "CIRCUIT_ERROR_THRESHOLD": os.environ.get("CIRCUIT_ERROR_THRESHOLD", 0.5),
+                "CIRCUIT_SLOW_CALL_SECONDS": os.environ.get("CIRCUIT_SLOW_CALL_SECONDS", 30),
+                "CIRCUIT_OPEN_SECONDS": os.environ.get("CIRCUIT_OPEN_SECONDS", 30),
+                "MODEL_FALLBACKS": os.environ.get("MODEL_FALLBACKS", "{}"),
+                "HEDGE_ENABLED": os.environ.get("HEDGE_ENABLED", "False").lower() in ('true', '1', 't'),
+                "HEDGE_PERCENTILE": os.environ.get("HEDGE_PERCENTILE", 95),
+                "HEDGE_MIN_DELAY": os.environ.get("HEDGE_MIN_DELAY", 0.5),
+                "HEDGE_MIN_SAMPLES": os.environ.get("HEDGE_MIN_SAMPLES", 20),
+                "HEDGE_BUDGET": os.environ.get("HEDGE_BUDGET", 0.1),
+                "IMAGE_MAX_CONCURRENCY": os.environ.get("IMAGE_MAX_CONCURRENCY", 4),
+                "IMAGE_MAX_JOBS": os.environ.get("IMAGE_MAX_JOBS", 1000),
+                "IMAGE_JOB_TTL": os.environ.get("IMAGE_JOB_TTL", 3600),
+                "IMAGE_JOB_MAX_WAIT": os.environ.get("IMAGE_JOB_MAX_WAIT", 30),
+                "RESPONSE_CACHE_SIZE": os.environ.get("RESPONSE_CACHE_SIZE", 1024),
+                "RESPONSE_CACHE_TTL": os.environ.get("RESPONSE_CACHE_TTL", 600),
+                "RESPONSE_CACHE_PATH": os.environ.get("RESPONSE_CACHE_PATH", ""),
+                "LOG_LEVEL": os.environ.get("LOG_LEVEL", "INFO"),
+                "LOG_FORMAT": os.environ.get("LOG_FORMAT", "json"),
+                "LOG_QUEUE_SIZE": os.environ.get("LOG_QUEUE_SIZE", 10000),
+                "LOG_SAMPLE_RATE": os.environ.get("LOG_SAMPLE_RATE", 0.01),
+                "LLM_BACKEND": os.environ.get("LLM_BACKEND", "live"),
+                "FAKE_LLM_LATENCY": os.environ.get("FAKE_LLM_LATENCY", "lognormal:0.3,0.5"),
+                "FAKE_LLM_ERROR_RATE": os.environ.get("FAKE_LLM_ERROR_RATE", 0),
+                "FAKE_LLM_ERROR_STATUS": os.environ.get("FAKE_LLM_ERROR_STATUS", 500),
+                "FAKE_LLM_RESPONSE_TOKENS": os.environ.get("FAKE_LLM_RESPONSE_TOKENS", 64),
+                "FAKE_LLM_MODELS": os.environ.get("FAKE_LLM_MODELS", ""),
+                "FAKE_LLM_SEED": os.environ.get("FAKE_LLM_SEED", ""),
                 "DEFAULT_IMAGE_MODEL": os.environ.get("DEFAULT_IMAGE_MODEL", "dall-e-2"),
+                "SEARCH_DEFAULT_LIMIT": os.environ.get("SEARCH_DEFAULT_LIMIT", 20),
+                "SEARCH_MAX_LIMIT": os.environ.get("SEARCH_MAX_LIMIT", 100),
+                "FTS_TITLE_WEIGHT": os.environ.get("FTS_TITLE_WEIGHT", 10.0),
             }
             return default_config
         except Exception as e:
@@ -1,3 +1,5 @@
+import json
+
 from config import Config
 
 _config = Config()
@@ -5,6 +7,22 @@ _config = Config()
 PORT = int(_config.get_config()["PORT"])
 WHITELIST_URL = _config.get_config()["WHITELIST_URL"].split(",")
 
+# Server (see serve.py). UVICORN_LOOP / UVICORN_HTTP "auto" pick uvloop and
+# httptools (uvicorn[standard]). With WORKERS > 1 and USE_SQLITE off the
+# workers share a scratch SQLite database in SHARED_DB_DIR (tmpfs) instead of
+# one InMemoryDatabase each. Provider quotas are split evenly between workers;
+# caches, image jobs and circuit breakers stay per worker, so background
+# image jobs are refused with more than one worker.
+HOST = _config.get_config()["HOST"]
+WORKERS = max(1, int(_config.get_config()["WORKERS"]))
+UVICORN_LOOP = _config.get_config()["UVICORN_LOOP"]
+UVICORN_HTTP = _config.get_config()["UVICORN_HTTP"]
+GRACEFUL_SHUTDOWN_TIMEOUT = int(_config.get_config()["GRACEFUL_SHUTDOWN_TIMEOUT"])
+KEEPALIVE_TIMEOUT = int(_config.get_config()["KEEPALIVE_TIMEOUT"])
+ACCESS_LOG = _config.get_config()["ACCESS_LOG"]
+RELOAD = _config.get_config()["RELOAD"]
+SHARED_DB_DIR = _config.get_config()["SHARED_DB_DIR"]
+
 
 
 # Default settings
@@ -24,5 +42,125 @@ DEFAULT_IMAGE_SETTINGS = {
     "n": 1
 }
 
+# JSON objects: {"alias": "model name"} and {"model name": max output tokens}
+MODEL_ALIASES = json.loads(_config.get_config()["MODEL_ALIASES"])
+MODEL_MAX_TOKENS = json.loads(_config.get_config()["MODEL_MAX_TOKENS"])
+
+# Provider model catalogs are refreshed in the background and cached on disk
+MODEL_CATALOG_CACHE_PATH = _config.get_config()["MODEL_CATALOG_CACHE_PATH"] or None
+MODEL_CATALOG_REFRESH_SECONDS = float(_config.get_config()["MODEL_CATALOG_REFRESH_SECONDS"])
+
+# Shared Atoma HTTP connection pool, timeouts are in seconds
+ATOMA_MAX_CONNECTIONS = int(_config.get_config()["ATOMA_MAX_CONNECTIONS"])
+ATOMA_MAX_KEEPALIVE_CONNECTIONS = int(_config.get_config()["ATOMA_MAX_KEEPALIVE_CONNECTIONS"])
+ATOMA_KEEPALIVE_EXPIRY = float(_config.get_config()["ATOMA_KEEPALIVE_EXPIRY"])
+ATOMA_TIMEOUT = float(_config.get_config()["ATOMA_TIMEOUT"])
+ATOMA_CONNECT_TIMEOUT = float(_config.get_config()["ATOMA_CONNECT_TIMEOUT"])
+
+# Max concurrent upstream calls per provider, and max queries per batch request
+ATOMA_MAX_CONCURRENCY = int(_config.get_config()["ATOMA_MAX_CONCURRENCY"])
+OPENAI_MAX_CONCURRENCY = int(_config.get_config()["OPENAI_MAX_CONCURRENCY"])
+BATCH_MAX_QUERIES = int(_config.get_config()["BATCH_MAX_QUERIES"])
+
+# Provider quotas as JSON {"provider": {"rpm": ..., "tpm": ...}}, per-model
+# quotas as {"model name": {"rpm": ..., "tpm": ...}}. Waits are in seconds.
+PROVIDER_RATE_LIMITS = json.loads(_config.get_config()["PROVIDER_RATE_LIMITS"])
+MODEL_RATE_LIMITS = json.loads(_config.get_config()["MODEL_RATE_LIMITS"])
+RATE_LIMIT_MAX_WAIT = float(_config.get_config()["RATE_LIMIT_MAX_WAIT"])
+RATE_LIMIT_MAX_QUEUE = int(_config.get_config()["RATE_LIMIT_MAX_QUEUE"])
+RATE_LIMIT_MAX_RETRIES = int(_config.get_config()["RATE_LIMIT_MAX_RETRIES"])
+RATE_LIMIT_BACKOFF_BASE = float(_config.get_config()["RATE_LIMIT_BACKOFF_BASE"])
+RATE_LIMIT_BACKOFF_MAX = float(_config.get_config()["RATE_LIMIT_BACKOFF_MAX"])
+
+# Provider health. A provider's circuit opens for CIRCUIT_OPEN_SECONDS when at
+# least CIRCUIT_ERROR_THRESHOLD of its last CIRCUIT_WINDOW calls failed or took
+# longer than CIRCUIT_SLOW_CALL_SECONDS. MODEL_FALLBACKS is JSON
+# {"model name": "equivalent model name"}, used while a circuit is open and,
+# with HEDGE_ENABLED, as a hedge once a call outlives the provider's
+# HEDGE_PERCENTILE latency. HEDGE_BUDGET caps hedges as a fraction of calls.
+LATENCY_WINDOW = int(_config.get_config()["LATENCY_WINDOW"])
+CIRCUIT_WINDOW = int(_config.get_config()["CIRCUIT_WINDOW"])
+CIRCUIT_MIN_CALLS = int(_config.get_config()["CIRCUIT_MIN_CALLS"])
+CIRCUIT_ERROR_THRESHOLD = float(_config.get_config()["CIRCUIT_ERROR_THRESHOLD"])
+CIRCUIT_SLOW_CALL_SECONDS = float(_config.get_config()["CIRCUIT_SLOW_CALL_SECONDS"])
+CIRCUIT_OPEN_SECONDS = float(_config.get_config()["CIRCUIT_OPEN_SECONDS"])
+MODEL_FALLBACKS = json.loads(_config.get_config()["MODEL_FALLBACKS"])
+HEDGE_ENABLED = _config.get_config()["HEDGE_ENABLED"]
+HEDGE_PERCENTILE = float(_config.get_config()["HEDGE_PERCENTILE"])
+HEDGE_MIN_DELAY = float(_config.get_config()["HEDGE_MIN_DELAY"])
+HEDGE_MIN_SAMPLES = int(_config.get_config()["HEDGE_MIN_SAMPLES"])
+HEDGE_BUDGET = float(_config.get_config()["HEDGE_BUDGET"])
+
+# Logging. LOG_FORMAT is "json" (one object per line) or "text". Records
+# beyond LOG_QUEUE_SIZE waiting for the writer thread are dropped, and
+# high-volume per-request events are kept with probability LOG_SAMPLE_RATE.
+LOG_LEVEL = _config.get_config()["LOG_LEVEL"].upper()
+LOG_FORMAT = _config.get_config()["LOG_FORMAT"].lower()
+LOG_QUEUE_SIZE = int(_config.get_config()["LOG_QUEUE_SIZE"])
+LOG_SAMPLE_RATE = float(_config.get_config()["LOG_SAMPLE_RATE"])
+
+# LLM_BACKEND=fake swaps the Atoma/OpenAI clients for a local stand-in (see
+# services/fake) for benchmarks and offline work. FAKE_LLM_LATENCY is
+# "fixed:s", "uniform:lo,hi", "normal:mean,stddev", "lognormal:median,sigma" or
+# "exponential:mean" in seconds; FAKE_LLM_ERROR_RATE of the calls fail with
+# FAKE_LLM_ERROR_STATUS. FAKE_LLM_MODELS is JSON {"provider": ["model name"]}.
+LLM_BACKEND = _config.get_config()["LLM_BACKEND"].lower()
+FAKE_LLM_LATENCY = _config.get_config()["FAKE_LLM_LATENCY"]
+FAKE_LLM_ERROR_RATE = float(_config.get_config()["FAKE_LLM_ERROR_RATE"])
+FAKE_LLM_ERROR_STATUS = int(_config.get_config()["FAKE_LLM_ERROR_STATUS"])
+FAKE_LLM_RESPONSE_TOKENS = int(_config.get_config()["FAKE_LLM_RESPONSE_TOKENS"])
+FAKE_LLM_MODELS = json.loads(_config.get_config()["FAKE_LLM_MODELS"] or "null") or {
+    "openai": [DEFAULT_LLM_MODEL, DEFAULT_IMAGE_MODEL]
+}
+FAKE_LLM_SEED = int(_config.get_config()["FAKE_LLM_SEED"]) if _config.get_config()["FAKE_LLM_SEED"] else None
+
+# Image generation, job TTL and max wait are in seconds
+IMAGE_MAX_CONCURRENCY = int(_config.get_config()["IMAGE_MAX_CONCURRENCY"])
+IMAGE_MAX_JOBS = int(_config.get_config()["IMAGE_MAX_JOBS"])
+IMAGE_JOB_TTL = float(_config.get_config()["IMAGE_JOB_TTL"])
+IMAGE_JOB_MAX_WAIT = float(_config.get_config()["IMAGE_JOB_MAX_WAIT"])
+
+# LLM response cache, RESPONSE_CACHE_PATH enables persistence across restarts
+RESPONSE_CACHE_SIZE = int(_config.get_config()["RESPONSE_CACHE_SIZE"])
+RESPONSE_CACHE_TTL = float(_config.get_config()["RESPONSE_CACHE_TTL"])
+RESPONSE_CACHE_PATH = _config.get_config()["RESPONSE_CACHE_PATH"] or None
+
+# Search
+SEARCH_DEFAULT_LIMIT = int(_config.get_config()["SEARCH_DEFAULT_LIMIT"])
+SEARCH_MAX_LIMIT = int(_config.get_config()["SEARCH_MAX_LIMIT"])
+FTS_TITLE_WEIGHT = float(_config.get_config()["FTS_TITLE_WEIGHT"])
+
+# Page size of /users/{user_id}/purchases
+PURCHASES_DEFAULT_LIMIT = int(_config.get_config()["PURCHASES_DEFAULT_LIMIT"])
+PURCHASES_MAX_LIMIT = int(_config.get_config()["PURCHASES_MAX_LIMIT"])
+
+# Bulk NDJSON import/export, rows per transaction (and per export read) and
+# how many bad lines an import reports back
+BULK_CHUNK_SIZE = int(_config.get_config()["BULK_CHUNK_SIZE"])
+BULK_MAX_ERRORS = int(_config.get_config()["BULK_MAX_ERRORS"])
+# Bearer token for /api/v1/bulk, the bulk API is disabled (CLI only) without one
+BULK_API_TOKEN = _config.get_config()["BULK_API_TOKEN"]
+
+# Test results kept per content, older ones are dropped as new ones come in
+TEST_RESULTS_RETENTION = int(_config.get_config()["TEST_RESULTS_RETENTION"])
+
+# Page size of /content/{content_id}/test_results
+TEST_RESULTS_DEFAULT_LIMIT = int(_config.get_config()["TEST_RESULTS_DEFAULT_LIMIT"])
+TEST_RESULTS_MAX_LIMIT = int(_config.get_config()["TEST_RESULTS_MAX_LIMIT"])
+
 USE_SQLITE = _config.get_config()["USE_SQLITE"]
 SQLITE_DB_PATH = _config.get_config()["SQLITE_DB_PATH"]
+SQLITE_SYNCHRONOUS = _config.get_config()["SQLITE_SYNCHRONOUS"].upper()
+SQLITE_CACHE_SIZE_KB = int(_config.get_config()["SQLITE_CACHE_SIZE_KB"])
+SQLITE_MMAP_SIZE = int(_config.get_config()["SQLITE_MMAP_SIZE"])
+SQLITE_BUSY_TIMEOUT_MS = int(_config.get_config()["SQLITE_BUSY_TIMEOUT_MS"])
+SQLITE_STATEMENT_CACHE_SIZE = int(_config.get_config()["SQLITE_STATEMENT_CACHE_SIZE"])
+DB_EXECUTOR_WORKERS = int(_config.get_config()["DB_EXECUTOR_WORKERS"])
+DB_MAX_QUEUE = int(_config.get_config()["DB_MAX_QUEUE"])
+
+# Read-through cache of get_content, bounded by entries and by serialized
+# size in bytes; 0 entries disables it. The TTL (seconds) bounds how stale
+# an entry can get when another worker process changes the content.
+CONTENT_CACHE_SIZE = int(_config.get_config()["CONTENT_CACHE_SIZE"])
+CONTENT_CACHE_MAX_BYTES = int(_config.get_config()["CONTENT_CACHE_MAX_BYTES"])
+CONTENT_CACHE_TTL = float(_config.get_config()["CONTENT_CACHE_TTL"]) or None
@@ -3,3 +3,7 @@
 # e.g.
 # from .controller import MongoController
 # __all__ = ["MongoController"]
+
+from .pool import SQLiteConnectionPool
+
+__all__ = ["SQLiteConnectionPool"]
@@ -0,0 +1,233 @@
+# async_db.py
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Union
+
+from constants import (
+    CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_SIZE, CONTENT_CACHE_TTL, DB_EXECUTOR_WORKERS, DB_MAX_QUEUE,
+    PURCHASES_DEFAULT_LIMIT, SEARCH_DEFAULT_LIMIT, TEST_RESULTS_DEFAULT_LIMIT
+)
+from database.errors import DatabaseBusyError
+from utils.lru import LRUCache
+from utils.metrics import db_operation_duration, metrics
+from models.schemas import Content, Purchase, PurchasePage, SearchResult, TestResult, TestResultPage, User
+
+
+class AsyncDatabase:
+    """
+    Awaitable interface over a database backend.
+
+    The backend is built by `factory` when the database is opened, not at
+    import time. Backends that do blocking I/O (``blocking = True``, e.g.
+    SQLiteDatabase) run on a dedicated thread pool so queries never block
+    the event loop.
+    At most `max_workers` queries run at once and `max_queue` more may wait;
+    past that, calls fail fast with DatabaseBusyError instead of piling up.
+    Backends that never block (InMemoryDatabase) are called inline.
+
+    `get_content` reads through an LRU cache of parsed Content, for either
+    backend. Every write path here invalidates the ids it touches; a new
+    update path must call `invalidate_content` too.
+    """
+    def __init__(self, factory: Callable[[], Any], max_workers: int = DB_EXECUTOR_WORKERS,
+                 max_queue: int = DB_MAX_QUEUE, content_cache_size: int = CONTENT_CACHE_SIZE,
+                 content_cache_bytes: int = CONTENT_CACHE_MAX_BYTES,
+                 content_cache_ttl: Optional[float] = CONTENT_CACHE_TTL):
+        self.factory = factory
+        self.max_workers = max_workers
+        self._max_pending = max_workers + max_queue
+        self._backend = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.blocking = False
+        # Counts work until the worker thread finishes it, even if the awaiting
+        # task was cancelled first, so the count is updated from both threads
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.content_cache: Optional[LRUCache] = None
+        if content_cache_size > 0:
+            self.content_cache = LRUCache(
+                content_cache_size, ttl=content_cache_ttl, max_bytes=content_cache_bytes,
+                sizeof=lambda content: len(content.model_dump_json())
+            )
+        # Bumped by every invalidation, so a read that raced with a write isn't cached
+        self._content_version = 0
+        self._register_metrics()
+
+    def _register_metrics(self):
+        metrics.callback(
+            "db_pending_operations", "Database operations running or queued", (),
+            lambda: {(): self._pending}
+        )
+        if self.content_cache is None:
+            return
+        metrics.callback(
+            "db_content_cache_requests_total", "get_content cache lookups", ("result",),
+            lambda: {("hit",): self.content_cache.hits, ("miss",): self.content_cache.misses},
+            kind="counter"
+        )
+        metrics.callback(
+            "db_content_cache_hit_ratio", "get_content cache hits per lookup", (),
+            lambda: {(): self.content_cache.stats()["hit_ratio"]}
+        )
+        metrics.callback(
+            "db_content_cache_evictions_total", "Content evicted to stay within the cache limits", (),
+            lambda: {(): self.content_cache.evictions},
+            kind="counter"
+        )
+        metrics.callback(
+            "db_content_cache_entries", "Content currently cached", (),
+            lambda: {(): len(self.content_cache)}
+        )
+        metrics.callback(
+            "db_content_cache_bytes", "Serialized size of the cached content", (),
+            lambda: {(): self.content_cache.bytes}
+        )
+
+    def open(self):
+        """Create the backend (and its executor), normally from the app lifespan"""
+        if self._backend is not None:
+            return
+        backend = self.factory()
+        self.blocking = getattr(backend, "blocking", False)
+        if self.blocking:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        self._backend = backend
+
+    @property
+    def backend(self):
+        # Opened lazily for scripts that use the database without the app
+        if self._backend is None:
+            self.open()
+        return self._backend
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        started = time.perf_counter()
+        # Resolving fn went through the backend property, so blocking is known
+        if not self.blocking:
+            result = fn(*args)
+            db_operation_duration.observe((fn.__name__,), time.perf_counter() - started)
+            return result
+
+        with self._pending_lock:
+            if self._pending >= self._max_pending:
+                raise DatabaseBusyError(f"Database queue is full ({self._pending} pending)")
+            self._pending += 1
+        try:
+            future = self._executor.submit(partial(fn, *args))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        result = await asyncio.wrap_future(future)
+        # Includes the time spent queued for a worker
+        db_operation_duration.observe((fn.__name__,), time.perf_counter() - started)
+        return result
+
+    def _release(self, future: Optional[Future] = None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.content_cache is not None:
+            self.content_cache.clear()
+        close = getattr(self._backend, "close", None)
+        if close is not None:
+            close()
+        self._backend = None
+
+    async def add_user(self, user: User) -> User:
+        return await self._run(self.backend.add_user, user)
+
+    async def get_user(self, user_id: Union[str, int]) -> Optional[User]:
+        return await self._run(self.backend.get_user, user_id)
+
+    def invalidate_content(self, *content_ids: Union[str, int]):
+        """Drop content from the get_content cache, after any write to it"""
+        self._content_version += 1
+        if self.content_cache is not None:
+            for content_id in content_ids:
+                self.content_cache.pop(str(content_id))
+
+    async def add_content(self, content: Content) -> Content:
+        content = await self._run(self.backend.add_content, content)
+        self.invalidate_content(content.id)
+        return content
+
+    async def get_content(self, content_id: str) -> Optional[Content]:
+        cache = self.content_cache
+        if cache is None:
+            return await self._run(self.backend.get_content, content_id)
+        content_id = str(content_id)
+        content = cache.get(content_id)
+        if content is not None:
+            return content
+        version = self._content_version
+        content = await self._run(self.backend.get_content, content_id)
+        if content is not None and version == self._content_version:
+            cache.set(content_id, content)
+        return content
+
+    async def search_content(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT,
+                             cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> SearchResult:
+        return await self._run(self.backend.search_content, query, limit, cursor, fields)
+
+    async def add_purchase(self, purchase: Purchase) -> Purchase:
+        return await self._run(self.backend.add_purchase, purchase)
+
+    async def purchase_if_not_owned(self, purchase: Purchase) -> Purchase:
+        """
+        Atomically record a purchase unless the user already owns the
+        content. Raises ContentNotFoundError, UserNotFoundError or
+        AlreadyPurchasedError (see database.errors) when refused.
+        """
+        return await self._run(self.backend.purchase_if_not_owned, purchase)
+
+    async def has_purchased(self, user_id: Union[str, int], content_id: Union[str, int]) -> bool:
+        return await self._run(self.backend.has_purchased, user_id, content_id)
+
+    async def get_purchases_by_user(self, user_id: Union[str, int]) -> List[Purchase]:
+        return await self._run(self.backend.get_purchases_by_user, user_id)
+
+    async def get_purchases_page_by_user(self, user_id: Union[str, int], limit: int = PURCHASES_DEFAULT_LIMIT,
+                                         cursor: Optional[str] = None) -> PurchasePage:
+        return await self._run(self.backend.get_purchases_page_by_user, user_id, limit, cursor)
+
+    async def get_purchases_by_content(self, content_id: Union[str, int]) -> List[Purchase]:
+        return await self._run(self.backend.get_purchases_by_content, content_id)
+
+    async def bulk_add_content(self, contents: List[Content]) -> int:
+        # Existing ids are replaced, so they are invalidated too
+        try:
+            return await self._run(self.backend.bulk_add_content, contents)
+        finally:
+            self.invalidate_content(*(content.id for content in contents if content.id))
+
+    async def bulk_add_purchases(self, purchases: List[Purchase]) -> int:
+        return await self._run(self.backend.bulk_add_purchases, purchases)
+
+    async def _iter_batches(self, batches: Iterator[List]) -> AsyncIterator[List]:
+        # Each batch is read on the executor, one at a time
+        while True:
+            batch = await self._run(next, batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def iter_content_batches(self, batch_size: int) -> AsyncIterator[List[Content]]:
+        return self._iter_batches(self.backend.iter_content(batch_size))
+
+    def iter_purchase_batches(self, batch_size: int) -> AsyncIterator[List[Purchase]]:
+        return self._iter_batches(self.backend.iter_purchases(batch_size))
+
+    async def add_test_result(self, result: TestResult) -> TestResult:
+        return await self._run(self.backend.add_test_result, result)
+
+    async def get_test_results(self, content_id: str, limit: int = TEST_RESULTS_DEFAULT_LIMIT,
+                               cursor: Optional[str] = None) -> TestResultPage:
+        return await self._run(self.backend.get_test_results, content_id, limit, cursor)
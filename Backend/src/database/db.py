@@ -1,12 +1,27 @@
 # db.py
-import os
 import uuid
 import json
-import sqlite3
-from typing import Dict, List, Optional, Union
-from models.schemas import Content, Purchase, User
+from typing import Dict, Iterator, List, Optional, Union
+from models.schemas import (
+    Content, Purchase, PurchasePage, SearchResult, TestResult, TestResultPage, User
+)
 
-from constants import USE_SQLITE, SQLITE_DB_PATH
+from constants import (
+    USE_SQLITE, SQLITE_DB_PATH, SEARCH_DEFAULT_LIMIT, FTS_TITLE_WEIGHT, TEST_RESULTS_RETENTION,
+    PURCHASES_DEFAULT_LIMIT, TEST_RESULTS_DEFAULT_LIMIT
+)
+from database.async_db import AsyncDatabase
+from database.errors import AlreadyPurchasedError, ContentNotFoundError, UserNotFoundError
+from database.pool import SQLiteConnectionPool
+from database.purchase_store import PurchaseStore
+from database.search_index import InvertedIndex
+from database.test_history import TestHistoryStore
+from utils.cursor import decode_cursor, encode_cursor
+from utils.fast_json import loads, raw_json
+from utils.text import tokenize
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
 
 
 class InMemoryDatabase:
@@ -14,7 +29,9 @@ class InMemoryDatabase:
     def __init__(self):
         self.users: Dict[str, User] = {}
         self.content: Dict[str, Content] = {}
-        self.purchases: List[Purchase] = []
+        self.purchases = PurchaseStore()
+        self.search_index = InvertedIndex(title_weight=FTS_TITLE_WEIGHT)
+        self.test_results = TestHistoryStore()
     
     def add_user(self, user: User) -> User:
         if not user.id:
@@ -29,62 +46,118 @@ class InMemoryDatabase:
         if not content.id:
             content.id = str(uuid.uuid4())
         self.content[str(content.id)] = content
+        self.search_index.add(str(content.id), content.title, content.description)
         return content
     
     def get_content(self, content_id: str) -> Optional[Content]:
         return self.content.get(content_id)
     
-    def search_content(self, query: str) -> List[Content]:
-        query = query.lower()
-        results = []
-        for content in self.content.values():
-            if query in content.title.lower() or query in content.description.lower():
-                results.append(content)
-        return results
+    def search_content(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT,
+                       cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> SearchResult:
+        after = decode_cursor(cursor, float, int) if cursor else None
+        doc_ids, next_key = self.search_index.search(query, limit, after)
+        results = [self.content[doc_id] for doc_id in doc_ids]
+        if fields:
+            results = [{field: getattr(content, field) for field in fields} for content in results]
+        return SearchResult(
+            results=results,
+            next_cursor=encode_cursor(*next_key) if next_key else None
+        )
     
     def add_purchase(self, purchase: Purchase) -> Purchase:
-        if not purchase.id:
-            # Find the highest ID and increment by 1
-            max_id = 0
-            for p in self.purchases:
-                if p.id and isinstance(p.id, int) and p.id > max_id:
-                    max_id = p.id
-            purchase.id = max_id + 1
-        self.purchases.append(purchase)
-        return purchase
+        return self.purchases.add(purchase)
+
+    def purchase_if_not_owned(self, purchase: Purchase) -> Purchase:
+        """
+        Record a purchase unless the user already owns the content. Runs
+        inline on the event loop with nothing awaited in between, so the
+        check and the insert can't interleave with another purchase.
+        """
+        if str(purchase.content_id) not in self.content:
+            raise ContentNotFoundError()
+        if self.purchases.has_purchased(purchase.user_id, purchase.content_id):
+            raise AlreadyPurchasedError()
+        if str(purchase.user_id) not in self.users:
+            raise UserNotFoundError()
+        return self.purchases.add(purchase)
+
+    def has_purchased(self, user_id: Union[str, int], content_id: Union[str, int]) -> bool:
+        return self.purchases.has_purchased(user_id, content_id)
     
     def get_purchases_by_user(self, user_id: Union[str, int]) -> List[Purchase]:
-        return [p for p in self.purchases if str(p.user_id) == str(user_id)]
+        return self.purchases.by_user_id(user_id)
     
     def get_purchases_by_content(self, content_id: Union[str, int]) -> List[Purchase]:
-        return [p for p in self.purchases if str(p.content_id) == str(content_id)]
+        return self.purchases.by_content_id(content_id)
+
+    def get_purchases_page_by_user(self, user_id: Union[str, int], limit: int = PURCHASES_DEFAULT_LIMIT,
+                                   cursor: Optional[str] = None) -> PurchasePage:
+        after_id = decode_cursor(cursor, int)[0] if cursor else None
+        purchases, more = self.purchases.page_by_user_id(user_id, limit, after_id)
+        return PurchasePage(
+            results=purchases,
+            next_cursor=encode_cursor(purchases[-1].id) if more else None
+        )
+
+    def bulk_add_content(self, contents: List[Content]) -> int:
+        for content in contents:
+            if not content.id:
+                content.id = str(uuid.uuid4())
+            self.content[str(content.id)] = content
+        self.search_index.add_many(
+            (str(content.id), content.title, content.description) for content in contents
+        )
+        return len(contents)
+
+    def iter_content(self, batch_size: int) -> Iterator[List[Content]]:
+        # A snapshot of references, content added meanwhile is not exported
+        contents = list(self.content.values())
+        for start in range(0, len(contents), batch_size):
+            yield contents[start:start + batch_size]
+
+    def bulk_add_purchases(self, purchases: List[Purchase]) -> int:
+        added = 0
+        for purchase in purchases:
+            # Like SQLite's INSERT OR IGNORE: existing ids and (user_id, content_id) pairs are skipped
+            if purchase.id and self.purchases.has_id(purchase.id):
+                continue
+            if not self.purchases.has_purchased(purchase.user_id, purchase.content_id):
+                self.purchases.add(purchase)
+                added += 1
+        return added
+
+    def iter_purchases(self, batch_size: int) -> Iterator[List[Purchase]]:
+        purchases = self.purchases.all()
+        for start in range(0, len(purchases), batch_size):
+            yield purchases[start:start + batch_size]
+
+    def add_test_result(self, result: TestResult) -> TestResult:
+        return self.test_results.add(result)
+
+    def get_test_results(self, content_id: str, limit: int = TEST_RESULTS_DEFAULT_LIMIT,
+                         cursor: Optional[str] = None) -> TestResultPage:
+        before_id = decode_cursor(cursor, int)[0] if cursor else None
+        results, more = self.test_results.list(content_id, limit, before_id)
+        return TestResultPage(
+            results=results,
+            next_cursor=encode_cursor(results[-1].id) if more else None
+        )
 
 
 class SQLiteDatabase:
     """SQLite database implementation"""
-    def __init__(self):
-        self.db_path = SQLITE_DB_PATH
-        self._initialize_db()
-    
-    def _initialize_db(self):
-        """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT,
-            profile_picture TEXT,
-            description TEXT
-        )
-        ''')
-        
-        # Create content table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS content (
-            id TEXT PRIMARY KEY,
+    # Queries hit the disk, AsyncDatabase runs them off the event loop
+    blocking = True
+    CONTENT_COLUMN_NAMES = (
+        "id", "title", "description", "llm_model", "llm_settings",
+        "price", "system_prompt", "metadata"
+    )
+    CONTENT_COLUMNS = ", ".join(CONTENT_COLUMN_NAMES)
+    JSON_COLUMNS = ("llm_settings", "metadata")
+    CONTENT_TABLE = '''
+        CREATE TABLE IF NOT EXISTS {table} (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
             title TEXT,
             description TEXT,
             llm_model TEXT,
@@ -93,47 +166,191 @@ class SQLiteDatabase:
             system_prompt TEXT,
             metadata TEXT
         )
+    '''
+
+    def __init__(self):
+        self.db_path = SQLITE_DB_PATH
+        self.pool = SQLiteConnectionPool(self.db_path)
+        self._initialize_db()
+    
+    def _initialize_db(self):
+        """Initialize the database with required tables"""
+        with self.pool.transaction() as conn:
+            # Create users table
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                username TEXT,
+                profile_picture TEXT,
+                description TEXT
+            )
+            ''')
+            
+            # Create content table. seq is the key of the full-text index, an
+            # INTEGER PRIMARY KEY so VACUUM can't renumber it the way it can
+            # the implicit rowid of a table keyed on TEXT.
+            content_columns = [row[1] for row in conn.execute("PRAGMA table_info(content)")]
+            if content_columns and "seq" not in content_columns:
+                self._migrate_content_seq(conn)
+            conn.execute(self.CONTENT_TABLE.format(table="content"))
+            
+            # Create purchases table
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS purchases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                content_id TEXT,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (content_id) REFERENCES content (id)
+            )
+            ''')
+
+            # Serves the paginated purchase list of a user
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_purchases_user ON purchases (user_id, id)"
+            )
+            # One purchase per user and content, which also makes entitlement
+            # checks a single index lookup. Databases from before the
+            # constraint may hold duplicates, keep the first of each.
+            unique_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_purchases_user_content'"
+            ).fetchone()
+            if not unique_exists:
+                removed = conn.execute('''
+                DELETE FROM purchases WHERE id NOT IN (
+                    SELECT MIN(id) FROM purchases GROUP BY user_id, content_id
+                )
+                ''').rowcount
+                if removed:
+                    logger.warning("Removed duplicate purchases", extra={"count": removed})
+                conn.execute(
+                    "CREATE UNIQUE INDEX idx_purchases_user_content ON purchases (user_id, content_id)"
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_purchases_content ON purchases (content_id)"
+            )
+
+            # Test history, append-only and trimmed to the newest results per content
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS test_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_id TEXT NOT NULL,
+                query TEXT,
+                response TEXT,
+                created_at REAL
+            )
+            ''')
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_test_results_content ON test_results (content_id, id)"
+            )
+
+            # Full-text index over content, kept in sync by triggers
+            fts_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'content_fts'"
+            ).fetchone()
+            conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(
+                title,
+                description,
+                content='content',
+                content_rowid='seq',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+            conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS content_fts_insert AFTER INSERT ON content BEGIN
+                INSERT INTO content_fts (rowid, title, description)
+                VALUES (new.seq, new.title, new.description);
+            END
+            ''')
+            conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS content_fts_delete AFTER DELETE ON content BEGIN
+                INSERT INTO content_fts (content_fts, rowid, title, description)
+                VALUES ('delete', old.seq, old.title, old.description);
+            END
+            ''')
+            conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS content_fts_update AFTER UPDATE ON content BEGIN
+                INSERT INTO content_fts (content_fts, rowid, title, description)
+                VALUES ('delete', old.seq, old.title, old.description);
+                INSERT INTO content_fts (rowid, title, description)
+                VALUES (new.seq, new.title, new.description);
+            END
+            ''')
+            if not fts_exists:
+                # Index listings that were stored before the FTS table existed
+                conn.execute("INSERT INTO content_fts (content_fts) VALUES ('rebuild')")
+
+    def _migrate_content_seq(self, conn):
+        """
+        Rebuild a content table keyed on id alone with the seq column. Rows
+        keep their rowid as seq, so search cursors stay valid; the FTS table
+        and its triggers are dropped and rebuilt by _initialize_db.
+        """
+        for trigger in ("content_fts_insert", "content_fts_delete", "content_fts_update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE IF EXISTS content_fts")
+        conn.execute(self.CONTENT_TABLE.format(table="content_migration"))
+        conn.execute(f'''
+        INSERT INTO content_migration (seq, {self.CONTENT_COLUMNS})
+        SELECT rowid, {self.CONTENT_COLUMNS} FROM content WHERE id IS NOT NULL
         ''')
-        
-        # Create purchases table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS purchases (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            content_id TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (content_id) REFERENCES content (id)
+        conn.execute("DROP TABLE content")
+        conn.execute("ALTER TABLE content_migration RENAME TO content")
+        logger.info("Added the seq key to the content table")
+
+    def close(self):
+        self.pool.close()
+
+    @staticmethod
+    def _row_to_content(row) -> Content:
+        return Content(
+            id=row[0],
+            title=row[1],
+            description=row[2],
+            llm_model=row[3],
+            llm_settings=loads(row[4]),
+            price=row[5],
+            system_prompt=row[6],
+            metadata=loads(row[7]) if row[7] else None
         )
-        ''')
-        
-        conn.commit()
-        conn.close()
     
+    def _projection(self, fields: Optional[List[str]], table: str = "") -> str:
+        """SELECT list for the requested fields, all content columns by default"""
+        if not fields:
+            fields = self.CONTENT_COLUMN_NAMES
+        unknown = [field for field in fields if field not in self.CONTENT_COLUMN_NAMES]
+        if unknown:
+            # Column names can't be bound as parameters, only allow known ones
+            raise ValueError(f"Unknown content fields: {unknown}")
+        return ", ".join(f"{table}{field}" for field in fields)
+
+    def _row_to_fields(self, row, fields: List[str]) -> Dict:
+        """A row as a response-ready dict, stored JSON columns are passed through unparsed"""
+        projected = dict(zip(fields, row))
+        for field in self.JSON_COLUMNS:
+            if field in projected:
+                projected[field] = raw_json(projected[field])
+        return projected
+
     def add_user(self, user: User) -> User:
         if not user.id:
             user.id = str(uuid.uuid4())
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO users (id, username, profile_picture, description) VALUES (?, ?, ?, ?)",
-            (str(user.id), user.username, user.profile_picture, user.description)
-        )
-        
-        conn.commit()
-        conn.close()
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (id, username, profile_picture, description) VALUES (?, ?, ?, ?)",
+                (str(user.id), user.username, user.profile_picture, user.description)
+            )
         
         return user
     
     def get_user(self, user_id: Union[str, int]) -> Optional[User]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT id, username, profile_picture, description FROM users WHERE id = ?", (str(user_id),))
-        result = cursor.fetchone()
-        
-        conn.close()
+        with self.pool.connection() as conn:
+            result = conn.execute(
+                "SELECT id, username, profile_picture, description FROM users WHERE id = ?",
+                (str(user_id),)
+            ).fetchone()
         
         if result:
             return User(
@@ -148,141 +365,324 @@ class SQLiteDatabase:
         if not content.id:
             content.id = str(uuid.uuid4())
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            INSERT INTO content (
-                id, title, description, llm_model, llm_settings, 
-                price, system_prompt, metadata
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                content.id, content.title, content.description, content.llm_model,
-                json.dumps(content.llm_settings), float(content.price), 
-                content.system_prompt, json.dumps(content.metadata or {})
+        with self.pool.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO content (
+                    id, title, description, llm_model, llm_settings, 
+                    price, system_prompt, metadata
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    content.id, content.title, content.description, content.llm_model,
+                    json.dumps(content.llm_settings), float(content.price), 
+                    content.system_prompt, json.dumps(content.metadata or {})
+                )
             )
-        )
-        
-        conn.commit()
-        conn.close()
         
         return content
     
+    def bulk_add_content(self, contents: List[Content]) -> int:
+        """
+        Insert (or replace, by id) a batch of content in one transaction.
+        An id repeated within the batch keeps its last listing, like
+        InMemoryDatabase; the FTS index is kept in sync by the triggers.
+        """
+        rows = {}
+        for content in contents:
+            if not content.id:
+                content.id = str(uuid.uuid4())
+            rows[str(content.id)] = (
+                str(content.id), content.title, content.description, content.llm_model,
+                json.dumps(content.llm_settings), float(content.price),
+                content.system_prompt, json.dumps(content.metadata or {})
+            )
+
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO content (
+                    id, title, description, llm_model, llm_settings,
+                    price, system_prompt, metadata
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    title = excluded.title,
+                    description = excluded.description,
+                    llm_model = excluded.llm_model,
+                    llm_settings = excluded.llm_settings,
+                    price = excluded.price,
+                    system_prompt = excluded.system_prompt,
+                    metadata = excluded.metadata
+                """,
+                rows.values()
+            )
+        return len(contents)
+
+    def iter_content(self, batch_size: int) -> Iterator[List[Content]]:
+        """
+        Every listing in insertion order, `batch_size` at a time. Each batch is
+        its own keyset query, so memory stays flat and no read stays open
+        between batches.
+        """
+        last_seq = 0
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT seq, {self.CONTENT_COLUMNS} FROM content WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1][0]
+            yield [self._row_to_content(row[1:]) for row in rows]
+
     def get_content(self, content_id: str) -> Optional[Content]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            """
-            SELECT id, title, description, llm_model, llm_settings,
-                   price, system_prompt, metadata
-            FROM content WHERE id = ?
-            """, 
-            (content_id,)
-        )
-        result = cursor.fetchone()
-        
-        conn.close()
+        with self.pool.connection() as conn:
+            result = conn.execute(
+                f"SELECT {self.CONTENT_COLUMNS} FROM content WHERE id = ?",
+                (content_id,)
+            ).fetchone()
         
         if result:
-            return Content(
-                id=result[0],
-                title=result[1],
-                description=result[2],
-                llm_model=result[3],
-                llm_settings=json.loads(result[4]),
-                price=result[5],
-                system_prompt=result[6],
-                metadata=json.loads(result[7]) if result[7] else None
-            )
+            return self._row_to_content(result)
         return None
     
-    def search_content(self, query: str) -> List[Content]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Use LIKE for case-insensitive search
-        search_param = f"%{query.lower()}%"
-        cursor.execute(
-            """
-            SELECT id, title, description, llm_model, llm_settings,
-                   price, system_prompt, metadata
-            FROM content 
-            WHERE LOWER(title) LIKE ? OR LOWER(description) LIKE ?
-            """, 
-            (search_param, search_param)
+    def search_content(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT,
+                       cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> SearchResult:
+        """
+        Full-text search over title and description using the FTS5 index.
+
+        Results are ranked by BM25 (title matches weigh more than description
+        matches) and paginated with a keyset cursor over (score, seq).
+        Results are response-ready dicts, of `fields` (only those columns
+        are read) or of every column, built without a Content round trip.
+        """
+        terms = tokenize(query)
+        # (score, seq) for both kinds of query, like the in-memory index
+        last_score, last_seq = decode_cursor(cursor, float, int) if cursor else (float("-inf"), 0)
+        with self.pool.connection() as conn:
+            if not terms:
+                # Nothing to match on, page through every listing in insertion order
+                rows = conn.execute(
+                    f"""
+                    SELECT seq, 0.0, {self._projection(fields)}
+                    FROM content
+                    WHERE seq > ?
+                    ORDER BY seq
+                    LIMIT ?
+                    """,
+                    (last_seq, limit + 1)
+                ).fetchall()
+            else:
+                # Quote every term so user input can't inject FTS5 syntax,
+                # and prefix match it the way the old substring search did.
+                match = " ".join(f'"{term}"*' for term in terms)
+                rows = conn.execute(
+                    f"""
+                    SELECT c.seq, bm25(content_fts, {FTS_TITLE_WEIGHT}, 1.0) AS score,
+                           {self._projection(fields, "c.")}
+                    FROM content_fts
+                    JOIN content c ON c.seq = content_fts.rowid
+                    WHERE content_fts MATCH ?
+                      AND (score > ? OR (score = ? AND c.seq > ?))
+                    ORDER BY score, c.seq
+                    LIMIT ?
+                    """,
+                    (match, last_score, last_score, last_seq, limit + 1)
+                ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[1], last[0])
+
+        fields = fields or self.CONTENT_COLUMN_NAMES
+        # Straight from our own rows, no need to validate them again
+        return SearchResult.model_construct(
+            results=[self._row_to_fields(row[2:], fields) for row in rows], next_cursor=next_cursor
         )
-        results = cursor.fetchall()
-        
-        conn.close()
-        
-        content_list = []
-        for result in results:
-            content_list.append(Content(
-                id=result[0],
-                title=result[1],
-                description=result[2],
-                llm_model=result[3],
-                llm_settings=json.loads(result[4]),
-                price=result[5],
-                system_prompt=result[6],
-                metadata=json.loads(result[7]) if result[7] else None
-            ))
-        
-        return content_list
     
     def add_purchase(self, purchase: Purchase) -> Purchase:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO purchases (user_id, content_id) VALUES (?, ?)",
-            (str(purchase.user_id), str(purchase.content_id))
-        )
-        
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO purchases (user_id, content_id) VALUES (?, ?) ON CONFLICT (user_id, content_id) DO NOTHING",
+                (str(purchase.user_id), str(purchase.content_id))
+            )
+        if not cursor.rowcount:
+            raise AlreadyPurchasedError()
         # Get the auto-incremented ID
         purchase.id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        
         return purchase
+
+    def purchase_if_not_owned(self, purchase: Purchase) -> Purchase:
+        """
+        Record a purchase in one statement: inserted only if the user and
+        the content exist, and skipped by the unique index if the user owns
+        it already, so concurrent requests can't double-purchase. Why it
+        was refused is only looked up when nothing was inserted.
+        """
+        user_id, content_id = str(purchase.user_id), str(purchase.content_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO purchases (user_id, content_id)
+                SELECT u.id, c.id FROM users u, content c WHERE u.id = ? AND c.id = ?
+                ON CONFLICT (user_id, content_id) DO NOTHING
+                """,
+                (user_id, content_id)
+            )
+            if cursor.rowcount:
+                purchase.id = cursor.lastrowid
+                return purchase
+            content_exists, user_exists = conn.execute(
+                """
+                SELECT EXISTS (SELECT 1 FROM content WHERE id = ?),
+                       EXISTS (SELECT 1 FROM users WHERE id = ?)
+                """,
+                (content_id, user_id)
+            ).fetchone()
+        if not content_exists:
+            raise ContentNotFoundError()
+        if not user_exists:
+            raise UserNotFoundError()
+        raise AlreadyPurchasedError()
+
+    def has_purchased(self, user_id: Union[str, int], content_id: Union[str, int]) -> bool:
+        """Entitlement check, one lookup in the unique (user_id, content_id) index"""
+        with self.pool.connection() as conn:
+            result = conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM purchases WHERE user_id = ? AND content_id = ?)",
+                (str(user_id), str(content_id))
+            ).fetchone()
+        return bool(result[0])
     
     def get_purchases_by_user(self, user_id: Union[str, int]) -> List[Purchase]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT id, user_id, content_id FROM purchases WHERE user_id = ?",
-            (str(user_id),)
-        )
-        results = cursor.fetchall()
-        
-        conn.close()
+        with self.pool.connection() as conn:
+            results = conn.execute(
+                "SELECT id, user_id, content_id FROM purchases WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchall()
         
         return [Purchase(id=result[0], user_id=result[1], content_id=result[2]) for result in results]
     
     def get_purchases_by_content(self, content_id: Union[str, int]) -> List[Purchase]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT id, user_id, content_id FROM purchases WHERE content_id = ?",
-            (str(content_id),)
-        )
-        results = cursor.fetchall()
-        
-        conn.close()
+        with self.pool.connection() as conn:
+            results = conn.execute(
+                "SELECT id, user_id, content_id FROM purchases WHERE content_id = ?",
+                (str(content_id),)
+            ).fetchall()
         
         return [Purchase(id=result[0], user_id=result[1], content_id=result[2]) for result in results]
 
+    def bulk_add_purchases(self, purchases: List[Purchase]) -> int:
+        """
+        Insert a batch of purchases in one transaction, ids and (user, content)
+        pairs that already exist are skipped
+        """
+        with self.pool.transaction() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO purchases (id, user_id, content_id) VALUES (?, ?, ?)",
+                [(purchase.id, str(purchase.user_id), str(purchase.content_id)) for purchase in purchases]
+            )
+            return cursor.rowcount
+
+    def iter_purchases(self, batch_size: int) -> Iterator[List[Purchase]]:
+        last_id = 0
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, user_id, content_id FROM purchases WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [Purchase(id=row[0], user_id=row[1], content_id=row[2]) for row in rows]
+
+    def get_purchases_page_by_user(self, user_id: Union[str, int], limit: int = PURCHASES_DEFAULT_LIMIT,
+                                   cursor: Optional[str] = None) -> PurchasePage:
+        """A user's purchases in id order, paginated with a keyset cursor over id"""
+        after_id = decode_cursor(cursor, int)[0] if cursor else 0
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, user_id, content_id FROM purchases
+                WHERE user_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (str(user_id), after_id, limit + 1)
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0])
+
+        return PurchasePage(
+            results=[Purchase(id=row[0], user_id=row[1], content_id=row[2]) for row in rows],
+            next_cursor=next_cursor
+        )
+
+    def add_test_result(self, result: TestResult) -> TestResult:
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO test_results (content_id, query, response, created_at) VALUES (?, ?, ?, ?)",
+                (result.content_id, result.query, result.response, result.created_at)
+            )
+            result.id = cursor.lastrowid
+            # Keep only the newest results, both lookups walk the (content_id, id) index
+            conn.execute(
+                """
+                DELETE FROM test_results
+                WHERE content_id = ? AND id <= (
+                    SELECT id FROM test_results WHERE content_id = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (result.content_id, result.content_id, TEST_RESULTS_RETENTION)
+            )
+        return result
+
+    def get_test_results(self, content_id: str, limit: int = TEST_RESULTS_DEFAULT_LIMIT,
+                         cursor: Optional[str] = None) -> TestResultPage:
+        """Newest results first, paginated with a keyset cursor over id"""
+        before_id = decode_cursor(cursor, int)[0] if cursor else 2 ** 63 - 1
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, content_id, query, response, created_at
+                FROM test_results
+                WHERE content_id = ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (content_id, before_id, limit + 1)
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0])
+
+        return TestResultPage(
+            results=[
+                TestResult(id=row[0], content_id=row[1], query=row[2], response=row[3], created_at=row[4])
+                for row in rows
+            ],
+            next_cursor=next_cursor
+        )
+
+
+def create_database():
+    """Choose the database implementation based on environment variable"""
+    if USE_SQLITE:
+        logger.info("Using SQLite database", extra={"path": SQLITE_DB_PATH})
+        return SQLiteDatabase()
+    logger.info("Using InMemoryDatabase")
+    return InMemoryDatabase()
+
 
-# Choose the database implementation based on environment variable
-if USE_SQLITE:
-    print(f"* Using SQLite database at {SQLITE_DB_PATH}")
-    db = SQLiteDatabase()
-else:
-    print("* Using InMemoryDatabase")
-    db = InMemoryDatabase()
\ No newline at end of file
+# Opened by the app lifespan (or lazily on first use)
+db = AsyncDatabase(create_database)
@@ -0,0 +1,31 @@
+# errors.py
+
+
+class DatabaseBusyError(Exception):
+    """Raised when the database work queue is full and the request is shed"""
+
+
+class PurchaseError(Exception):
+    """A purchase was refused, `status_code` is what the API answers with"""
+    status_code = 400
+
+
+class ContentNotFoundError(PurchaseError):
+    status_code = 404
+
+    def __init__(self, message: str = "Content not found"):
+        super().__init__(message)
+
+
+class UserNotFoundError(PurchaseError):
+    status_code = 404
+
+    def __init__(self, message: str = "User not found"):
+        super().__init__(message)
+
+
+class AlreadyPurchasedError(PurchaseError):
+    status_code = 403
+
+    def __init__(self, message: str = "User has already purchased this content"):
+        super().__init__(message)
@@ -0,0 +1,59 @@
+# purchase_store.py
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from database.errors import AlreadyPurchasedError
+from models.schemas import Purchase
+
+
+class PurchaseStore:
+    """
+    In-memory purchase store indexed by user and by content.
+
+    Ids come from a monotonic counter and both indexes are keyed by the
+    normalized (str) ids, so adding a purchase and checking an entitlement
+    are constant time no matter how many purchases have been recorded.
+    """
+    def __init__(self):
+        self.by_user: Dict[str, Dict[str, Purchase]] = {}
+        self.by_content: Dict[str, Dict[str, Purchase]] = {}
+        self._ids: Set[int] = set()
+        self._last_id = 0
+
+    def add(self, purchase: Purchase) -> Purchase:
+        """Record a purchase, raises AlreadyPurchasedError if the user owns the content already"""
+        if self.has_purchased(purchase.user_id, purchase.content_id):
+            # Like the unique (user_id, content_id) index of the SQLite backend
+            raise AlreadyPurchasedError()
+        if not purchase.id:
+            purchase.id = self._last_id + 1
+        self._last_id = max(self._last_id, purchase.id)
+        self._ids.add(purchase.id)
+        user_id, content_id = str(purchase.user_id), str(purchase.content_id)
+        self.by_user.setdefault(user_id, {})[content_id] = purchase
+        self.by_content.setdefault(content_id, {})[user_id] = purchase
+        return purchase
+
+    def has_id(self, purchase_id: int) -> bool:
+        return purchase_id in self._ids
+
+    def has_purchased(self, user_id: Union[str, int], content_id: Union[str, int]) -> bool:
+        return str(content_id) in self.by_user.get(str(user_id), ())
+
+    def by_user_id(self, user_id: Union[str, int]) -> List[Purchase]:
+        return list(self.by_user.get(str(user_id), {}).values())
+
+    def by_content_id(self, content_id: Union[str, int]) -> List[Purchase]:
+        return list(self.by_content.get(str(content_id), {}).values())
+
+    def all(self) -> List[Purchase]:
+        """Every purchase, in id order"""
+        purchases = [purchase for by_content in self.by_user.values() for purchase in by_content.values()]
+        return sorted(purchases, key=lambda purchase: purchase.id)
+
+    def page_by_user_id(self, user_id: Union[str, int], limit: int,
+                        after_id: Optional[int] = None) -> Tuple[List[Purchase], bool]:
+        """Up to `limit` purchases with id > `after_id` in id order, and whether more remain"""
+        purchases = sorted(self.by_user.get(str(user_id), {}).values(), key=lambda purchase: purchase.id)
+        if after_id is not None:
+            purchases = [purchase for purchase in purchases if purchase.id > after_id]
+        return purchases[:limit], len(purchases) > limit
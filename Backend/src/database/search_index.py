@@ -0,0 +1,178 @@
+# search_index.py
+import bisect
+import heapq
+import math
+from collections import Counter
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.text import tokenize
+
+# BM25 tuning, same defaults SQLite's FTS5 uses
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class InvertedIndex:
+    """
+    Incrementally maintained inverted index over title and description.
+
+    Every term maps to a posting list of {doc_id: weighted term frequency}.
+    Terms are also kept in a sorted list so prefix queries expand with a
+    bisect instead of scanning the vocabulary. A query intersects the
+    posting lists of its terms (smallest first), scores the survivors with
+    BM25 and keeps the top k with a heap, so the cost depends on the size of
+    the posting lists involved and not on the size of the catalog.
+    """
+    def __init__(self, title_weight: float = 1.0):
+        self.title_weight = title_weight
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self._sorted_terms: List[str] = []
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        # Insertion sequence, used as a stable tie breaker and for paging
+        self._seq: Dict[str, int] = {}
+        self._counter = count(1)
+        # Sequences (ascending, as they are only ever appended) and their doc
+        # ids, so listing pages starts from a cursor with a bisect
+        self._seq_order: List[int] = []
+        self._seq_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._seq)
+
+    def add(self, doc_id: str, title: str, description: str):
+        """Index a document, replacing any previous version with the same id"""
+        for term in self._add(doc_id, title, description):
+            bisect.insort(self._sorted_terms, term)
+
+    def add_many(self, docs: Iterable[Tuple[str, str, str]]):
+        """Index (doc_id, title, description) documents, sorting new terms in once at the end"""
+        new_terms = []
+        for doc_id, title, description in docs:
+            if doc_id in self._seq and new_terms:
+                # Replacing may drop terms, which must already be in the sorted list
+                self._merge_terms(new_terms)
+                new_terms = []
+            new_terms.extend(self._add(doc_id, title, description))
+        self._merge_terms(new_terms)
+
+    def _merge_terms(self, terms: List[str]):
+        if terms:
+            self._sorted_terms.extend(terms)
+            self._sorted_terms.sort()
+
+    def _add(self, doc_id: str, title: str, description: str) -> List[str]:
+        """Index a document, returns the terms that are new to the vocabulary"""
+        if doc_id in self._seq:
+            self.remove(doc_id)
+
+        title_terms = Counter(tokenize(title))
+        description_terms = Counter(tokenize(description))
+        terms = set(title_terms) | set(description_terms)
+        new_terms = []
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                new_terms.append(term)
+            posting[doc_id] = self.title_weight * title_terms[term] + description_terms[term]
+
+        length = sum(title_terms.values()) + sum(description_terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        seq = self._seq[doc_id] = next(self._counter)
+        self._seq_order.append(seq)
+        self._seq_ids.append(doc_id)
+        return new_terms
+
+    def remove(self, doc_id: str):
+        """Drop a document from the index"""
+        if doc_id not in self._seq:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+                del self._sorted_terms[bisect.bisect_left(self._sorted_terms, term)]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        position = bisect.bisect_left(self._seq_order, self._seq.pop(doc_id))
+        del self._seq_order[position]
+        del self._seq_ids[position]
+
+    def _expand(self, prefix: str) -> List[str]:
+        """All indexed terms starting with prefix"""
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\U0010ffff", start)
+        return self._sorted_terms[start:end]
+
+    def _matches(self, prefix: str) -> Dict[str, float]:
+        """Merged posting list of every term matching prefix"""
+        expanded = self._expand(prefix)
+        if len(expanded) == 1:
+            return self.postings[expanded[0]]
+        merged: Dict[str, float] = {}
+        for term in expanded:
+            for doc_id, tf in self.postings[term].items():
+                merged[doc_id] = merged.get(doc_id, 0.0) + tf
+        return merged
+
+    def search(self, query: str, limit: int,
+               after: Optional[Tuple[float, int]] = None) -> Tuple[List[str], Optional[Tuple[float, int]]]:
+        """
+        Return up to `limit` doc ids matching every term of the query (each
+        term is prefix matched), best match first.
+
+        Results are ordered by the key (-score, seq). Pass the returned key as
+        `after` to fetch the next page; it is None on the last page.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return self._list(limit, after)
+
+        posting_lists = sorted((self._matches(term) for term in dict.fromkeys(terms)), key=len)
+        if not posting_lists[0]:
+            return [], None
+
+        candidates = set(posting_lists[0])
+        for posting in posting_lists[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return [], None
+
+        n_docs = len(self._seq)
+        avg_length = self._total_length / n_docs
+        idf = [
+            math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for posting in posting_lists
+        ]
+
+        def sort_key(doc_id: str) -> Tuple[float, int]:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / avg_length)
+            score = 0.0
+            for posting, term_idf in zip(posting_lists, idf):
+                tf = posting[doc_id]
+                score += term_idf * tf * (BM25_K1 + 1) / (tf + norm)
+            return -score, self._seq[doc_id]
+
+        keyed = ((sort_key(doc_id), doc_id) for doc_id in candidates)
+        if after is not None:
+            after = tuple(after)
+            keyed = (item for item in keyed if item[0] > after)
+        top = heapq.nsmallest(limit + 1, keyed)
+        return self._page(top, limit)
+
+    def _list(self, limit: int, after: Optional[Tuple[float, int]]) -> Tuple[List[str], Optional[Tuple[float, int]]]:
+        """Page through every document in insertion order"""
+        start = bisect.bisect_right(self._seq_order, after[1]) if after is not None else 0
+        end = start + limit + 1
+        top = [((0.0, seq), doc_id) for seq, doc_id in zip(self._seq_order[start:end], self._seq_ids[start:end])]
+        return self._page(top, limit)
+
+    @staticmethod
+    def _page(top: List[Tuple[Tuple[float, int], str]], limit: int) -> Tuple[List[str], Optional[Tuple[float, int]]]:
+        next_key = top[limit - 1][0] if len(top) > limit else None
+        return [doc_id for _, doc_id in top[:limit]], next_key
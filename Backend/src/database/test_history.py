@@ -0,0 +1,42 @@
+# test_history.py
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from constants import TEST_RESULTS_RETENTION
+from models.schemas import TestResult
+
+
+class TestHistoryStore:
+    """
+    In-memory test history, a ring buffer of the latest `retention` results
+    per content.
+
+    Results are append-only and ids come from one monotonic counter, so
+    newest-first pages are keyed by id and appending never touches the
+    content itself.
+    """
+    def __init__(self, retention: int = TEST_RESULTS_RETENTION):
+        self.retention = retention
+        self.by_content: Dict[str, Deque[TestResult]] = {}
+        self._last_id = 0
+
+    def add(self, result: TestResult) -> TestResult:
+        self._last_id += 1
+        result.id = self._last_id
+        history = self.by_content.get(result.content_id)
+        if history is None:
+            history = self.by_content[result.content_id] = deque(maxlen=self.retention)
+        history.append(result)
+        return result
+
+    def list(self, content_id: str, limit: int,
+             before_id: Optional[int] = None) -> Tuple[List[TestResult], bool]:
+        """Up to `limit` results older than `before_id`, newest first, and whether more remain"""
+        results = []
+        for result in reversed(self.by_content.get(content_id, ())):
+            if before_id is not None and result.id >= before_id:
+                continue
+            if len(results) == limit:
+                return results, True
+            results.append(result)
+        return results, False
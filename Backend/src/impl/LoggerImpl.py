@@ -2,15 +2,15 @@ import logging
 
 
 class LoggerImpl:
+    """
+    Named logger for a module.
+
+    Handlers are not attached here: records propagate to the root logger,
+    which `setup_logging` (impl.structured_logging) configures once per
+    process with a queue handler and a background writer thread.
+    """
     def __init__(self, logger_name):
         self.logger = logging.getLogger(logger_name)
-        self.logger.setLevel(logging.DEBUG)
-        console_handler = logging.StreamHandler()
-        console_formatter = logging.Formatter(
-            "%(levelname)s - %(asctime)s - %(name)s - %(message)s"
-        )
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
-    
+
     def get_logger(self):
         return self.logger
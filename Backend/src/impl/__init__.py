@@ -1,3 +1,4 @@
 from .LoggerImpl import LoggerImpl
+from .structured_logging import request_id_var, setup_logging, shutdown_logging
 
-__all__ = ["LoggerImpl"]
+__all__ = ["LoggerImpl", "request_id_var", "setup_logging", "shutdown_logging"]
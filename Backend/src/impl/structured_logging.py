@@ -0,0 +1,119 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Correlation id of the request being handled, set by the request id middleware
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, anything else was passed through `extra`
+# (apart from the sampling hint and uvicorn's ANSI-colored copy of the message)
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {
+    "message", "asctime", "request_id", "taskName", "sample_rate", "color_message"
+}
+
+# Libraries that log every HTTP call at INFO
+_NOISY_LOGGERS = ("httpx", "httpcore", "openai", "hpack")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, `extra` fields included as top-level keys"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs on the caller's thread before the record is queued: stamps the
+    request id and drops sampled-out records (``extra={"sample_rate": 0.01}``)
+    before any work is spent on them. Warnings and errors are never sampled.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = record.__dict__.get("sample_rate")
+        if sample_rate is not None and record.levelno < logging.WARNING and random.random() >= sample_rate:
+            return False
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of waiting when the writer falls behind"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                  queue_size: Optional[int] = None):
+    """
+    Route all logging through a bounded queue to a writer thread.
+
+    Request handling only formats the record and puts it on the queue; the
+    blocking write to stderr happens on the listener's thread. Safe to call
+    more than once, only the first call configures anything.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    from constants import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if (fmt or LOG_FORMAT) == "json":
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(levelname)s - %(asctime)s - %(name)s - [%(request_id)s] %(message)s"
+        ))
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size or LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    root.addHandler(queue_handler)
+    _queue_handler = queue_handler
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
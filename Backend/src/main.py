@@ -1,23 +1,79 @@
-import uvicorn
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
 
-from constants import PORT
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from database.db import db
+from database.errors import DatabaseBusyError
+from impl import setup_logging
 from middlewares import cors
+from middlewares import metrics as request_metrics
+from middlewares import request_id
 from router import router_v1
+from services.errors import LLMProviderError
+from services.jobs import image_jobs
+from services.llm_service import llm_service
+from utils.fast_json import FastJSONResponse
+from utils.metrics import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here waits on the network: model catalogs load in the background
+    db.open()
+    llm_service.response_cache.load()
+    llm_service.start()
+    yield
+    await image_jobs.cancel_all()
+    llm_service.response_cache.save()
+    await llm_service.aclose()
+    db.close()
+
+
+async def database_busy_handler(request: Request, exc: DatabaseBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 
-app = FastAPI(
-    title="Prompt Proof Market Backend",
-    description="API Endpoints for Prompt Proof Market Backend",
-)
+async def provider_error_handler(request: Request, exc: LLMProviderError):
+    # 429 / 503 when we are over quota or shedding load, 502 for upstream failures
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
 
-cors.configure(app)
-app.include_router(router=router_v1)
+
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/healthcheck")
 def healthcheck():
     return {"status": "ok"}
 
 
+def create_app() -> FastAPI:
+    setup_logging()
+    app = FastAPI(
+        title="Prompt Proof Market Backend",
+        description="API Endpoints for Prompt Proof Market Backend",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+
+    cors.configure(app)
+    request_metrics.configure(app)
+    # Added last so it wraps everything else and every log line has the id
+    request_id.configure(app)
+    app.include_router(router=router_v1)
+    app.add_exception_handler(DatabaseBusyError, database_busy_handler)
+    app.add_exception_handler(LLMProviderError, provider_error_handler)
+    app.add_api_route("/healthcheck", healthcheck, methods=["GET"])
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=PORT, log_level="info", reload=True)
+    # Configured from .env (WORKERS, RELOAD, ...), see serve.py
+    from serve import serve
+    serve()
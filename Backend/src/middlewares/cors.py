@@ -11,4 +11,7 @@ def configure(app: FastAPI):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Pagination cursor of list endpoints that return a bare list, and
+        # the correlation id to quote when reporting a failed request
+        expose_headers=["X-Next-Cursor", "X-Request-ID"],
     )
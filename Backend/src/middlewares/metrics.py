@@ -0,0 +1,43 @@
+import time
+
+from fastapi import FastAPI
+
+from utils.metrics import http_request_duration
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the latency of every HTTP request, labelled by its route
+    template (e.g. /api/v1/users/{user_id}) rather than the raw path so the
+    number of series stays bounded. Plain ASGI, so it adds no per-request
+    task or body buffering; streamed responses are timed to their last chunk.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                (scope["method"], getattr(route, "path", "unmatched"), str(status)),
+                time.perf_counter() - started
+            )
+
+
+def configure(app: FastAPI):
+    app.add_middleware(RequestMetricsMiddleware)
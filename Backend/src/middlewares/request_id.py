@@ -0,0 +1,49 @@
+import re
+import uuid
+
+from fastapi import FastAPI
+
+from impl import request_id_var
+
+# Accept the caller's id only if it is short and can't break a log line or header
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request a correlation id, taken from the X-Request-ID
+    header when the caller (or a proxy) sent a valid one. The id is echoed
+    back in the response and attached to every log record written while the
+    request is handled, including by tasks it starts.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+def configure(app: FastAPI):
+    app.add_middleware(RequestIdMiddleware)
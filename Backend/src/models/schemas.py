@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Dict, List, Union, Optional
-from constants import DEFAULT_LLM_MODEL, DEFAULT_LLM_SETTINGS, DEFAULT_IMAGE_MODEL, DEFAULT_IMAGE_SETTINGS
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Union, Optional
+from constants import (
+    DEFAULT_LLM_MODEL, DEFAULT_LLM_SETTINGS, DEFAULT_IMAGE_MODEL, DEFAULT_IMAGE_SETTINGS,
+    SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, BATCH_MAX_QUERIES
+)
 
 
 class User(BaseModel):
@@ -21,6 +24,10 @@ class Content(BaseModel):
     metadata: Optional[Dict] = None
 
 
+# Fields a list view may project search results down to
+CONTENT_FIELDS = tuple(Content.model_fields)
+
+
 class ContentCreate(BaseModel):
     title: str
     description: str
@@ -44,8 +51,38 @@ class Purchase(BaseModel):
     id: Optional[int] = None
 
 
+class TestResult(BaseModel):
+    content_id: str
+    query: str
+    response: str
+    created_at: float
+    id: Optional[int] = None
+
+
+class TestResultPage(BaseModel):
+    results: List[TestResult]
+    next_cursor: Optional[str] = None
+
+
 class SearchQuery(BaseModel):
     query: str
+    limit: int = Field(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT)
+    cursor: Optional[str] = None
+    # Only return these Content fields, e.g. ["id", "title", "price"]
+    fields: Optional[List[str]] = None
+
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        unknown = [field for field in fields if field not in CONTENT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown}, expected any of {list(CONTENT_FIELDS)}")
+        if not fields:
+            raise ValueError("fields must not be empty")
+        # Dedupe, keep the requested order
+        return list(dict.fromkeys(fields))
 
 
 class TestContentRequest(BaseModel):
@@ -54,6 +91,17 @@ class TestContentRequest(BaseModel):
     llm_settings: Optional[Dict] = DEFAULT_LLM_SETTINGS
     content_id: Optional[str] = None
     user_id: Optional[str] = None
+    # Accept a cached response even if llm_settings sample (temperature > 0)
+    allow_cached: bool = False
+
+
+class BatchTestContentRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+    llm_model: Optional[str] = DEFAULT_LLM_MODEL
+    llm_settings: Optional[Dict] = DEFAULT_LLM_SETTINGS
+    content_id: Optional[str] = None
+    user_id: Optional[str] = None
+    allow_cached: bool = False
 
 
 class TestImageRequest(BaseModel):
@@ -62,7 +110,23 @@ class TestImageRequest(BaseModel):
     llm_settings: Optional[Dict] = DEFAULT_IMAGE_SETTINGS
     content_id: Optional[str] = None
     user_id: Optional[str] = None
+    # Return a job id right away instead of waiting for the image
+    background: bool = False
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    response: Optional[str] = None
+    error: Optional[str] = None
 
 
 class SearchResult(BaseModel):
-    results: List[Content]
\ No newline at end of file
+    # Projected results (SearchQuery.fields) are plain dicts of the requested fields
+    results: List[Union[Dict[str, Any], Content]]
+    next_cursor: Optional[str] = None
+
+
+class PurchasePage(BaseModel):
+    results: List[Purchase]
+    next_cursor: Optional[str] = None
@@ -2,6 +2,7 @@ from .test_endpoints import router as test_router
 
 # route/__init__.py
 from fastapi import APIRouter
+from router.bulk_endpoints import router as bulk_router
 from router.content_endpoints import router as content_router
 from router.user_endpoints import router as user_router
 
@@ -11,5 +12,6 @@ router_v1.include_router(test_router)
 
 router_v1.include_router(content_router)
 router_v1.include_router(user_router)
+router_v1.include_router(bulk_router)
 
 __all__ = ["test_router"]
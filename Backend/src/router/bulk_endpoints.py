@@ -0,0 +1,85 @@
+import hmac
+from typing import Awaitable, Callable, Dict, List, Optional, Type
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from models.schemas import Content, Purchase
+from database.db import db
+from services.bulk import NDJSONImport, iter_lines, to_ndjson
+from constants import BULK_API_TOKEN, BULK_CHUNK_SIZE
+
+
+def _require_bulk_token(authorization: Optional[str] = Header(None)):
+    """
+    Imports overwrite listings and grant purchases, and exports hold every
+    user's purchases, so the whole router needs the BULK_API_TOKEN bearer token
+    """
+    if not BULK_API_TOKEN:
+        raise HTTPException(status_code=403, detail="The bulk API is disabled, use src/cli.py")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), BULK_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid bulk API token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/bulk", tags=["bulk"], dependencies=[Depends(_require_bulk_token)])
+
+NDJSON = "application/x-ndjson"
+
+
+async def _import(request: Request, model: Type[BaseModel],
+                  write: Callable[[List], Awaitable[int]]) -> Dict:
+    importer = NDJSONImport(model)
+
+    async def flush(batch: List):
+        if not batch:
+            return
+        try:
+            importer.written(await write(batch))
+        except Exception as ex:
+            importer.rejected(batch, ex)
+
+    async for line in iter_lines(request.stream()):
+        batch = importer.feed(line)
+        if batch:
+            await flush(batch)
+    await flush(importer.finish())
+    return importer.report()
+
+@router.post("/content", response_model=Dict)
+async def import_content(request: Request):
+    """
+    Import listings from an NDJSON body, one Content object per line. Listings
+    whose id already exists are replaced. Rows are written BULK_CHUNK_SIZE per
+    transaction; bad lines are skipped and reported.
+    """
+    return await _import(request, Content, db.bulk_add_content)
+
+@router.get("/content")
+async def export_content():
+    """
+    Export every listing as NDJSON, streamed BULK_CHUNK_SIZE rows at a time
+    """
+    async def rows():
+        async for batch in db.iter_content_batches(BULK_CHUNK_SIZE):
+            yield to_ndjson(batch)
+    return StreamingResponse(rows(), media_type=NDJSON)
+
+@router.post("/purchases", response_model=Dict)
+async def import_purchases(request: Request):
+    """
+    Import purchases from an NDJSON body, one Purchase object per line.
+    Purchases whose id already exists are skipped.
+    """
+    return await _import(request, Purchase, db.bulk_add_purchases)
+
+@router.get("/purchases")
+async def export_purchases():
+    """
+    Export every purchase as NDJSON, streamed BULK_CHUNK_SIZE rows at a time
+    """
+    async def rows():
+        async for batch in db.iter_purchase_batches(BULK_CHUNK_SIZE):
+            yield to_ndjson(batch)
+    return StreamingResponse(rows(), media_type=NDJSON)
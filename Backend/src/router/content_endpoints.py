@@ -1,13 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+import asyncio
+import json
+import sqlite3
+import time
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Dict, List, Optional, Tuple, Union
 
 from models.schemas import (
     Content, ContentCreate, ImageContentCreate, Purchase, SearchQuery, 
-    TestContentRequest, SearchResult, TestImageRequest
+    TestContentRequest, SearchResult, TestImageRequest, JobStatus, BatchTestContentRequest,
+    TestResult, TestResultPage
 )
 from database.db import db
+from database.errors import DatabaseBusyError, PurchaseError
+from services.errors import LLMProviderError
+from services.jobs import JobQueueFullError, image_jobs
 from services.llm_service import llm_service
-from constants import DEFAULT_LLM_MODEL, DEFAULT_IMAGE_MODEL
+from utils.fast_json import FastJSONResponse
+from constants import (
+    DEFAULT_LLM_MODEL, DEFAULT_IMAGE_MODEL, IMAGE_JOB_MAX_WAIT, LOG_SAMPLE_RATE, TEST_RESULTS_DEFAULT_LIMIT,
+    TEST_RESULTS_MAX_LIMIT, WORKERS
+)
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
 
 router = APIRouter(prefix="/content", tags=["content"])
 
@@ -25,7 +41,7 @@ async def add_content(content_data: ContentCreate):
         metadata=content_data.metadata or {}
     )
     
-    saved_content = db.add_content(content)
+    saved_content = await db.add_content(content)
     return saved_content
 
 @router.post("/add_image_generation", response_model=Content)
@@ -46,84 +62,92 @@ async def add_image_generation_content(content_data: ImageContentCreate):
         metadata=metadata
     )
     
-    saved_content = db.add_content(content)
+    saved_content = await db.add_content(content)
     return saved_content
 
 @router.post("/search", response_model=SearchResult)
 async def search_content(search_query: SearchQuery):
     """
-    Search for content by title and description
+    Search for content by title and description, best matches first.
+    Pass `next_cursor` from the previous page as `cursor` to get the next page,
+    and `fields` (e.g. ["id", "title", "price"]) to only get those fields back.
     """
-    results = db.search_content(search_query.query)
-    return SearchResult(results=results)
+    try:
+        result = await db.search_content(
+            search_query.query, search_query.limit, search_query.cursor, search_query.fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Database objects, serialized as they are instead of validated against SearchResult again
+    return FastJSONResponse({"results": result.results, "next_cursor": result.next_cursor})
 
 @router.get("/get_content/{content_id}", response_model=Content)
 async def get_content(content_id: str):
     """
     Get content details by ID
     """
-    content = db.get_content(content_id)
+    content = await db.get_content(content_id)
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
-    return content
+    return FastJSONResponse(content)
+
+@router.get("/{content_id}/test_results", response_model=TestResultPage)
+async def get_test_results(
+    content_id: str,
+    limit: int = Query(TEST_RESULTS_DEFAULT_LIMIT, ge=1, le=TEST_RESULTS_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
+    """
+    Test history of a content, newest first. Pass `next_cursor` from the
+    previous page as `cursor` to get older results.
+    """
+    try:
+        return FastJSONResponse(await db.get_test_results(content_id, limit, cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/purchase", response_model=Purchase)
 async def purchase_content(purchase_data: Purchase):
     """
     Record a purchase of content
     """
-    # Validate that the content and user exist
-    content = db.get_content(purchase_data.content_id)
-    if not content:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
-    # see if the user has purchased the content
-    purchase = db.get_purchases_by_content(purchase_data.content_id)
-    has_purchased = any(p.user_id == purchase_data.user_id for p in purchase)
-    
-    print(f"* purchase: {purchase} has_purchased: {has_purchased}")
-    if has_purchased:
-        raise HTTPException(status_code=403, detail="User has already purchased this content")
-
-    user = db.get_user(purchase_data.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Record the purchase
-    purchase = db.add_purchase(purchase_data)
-    return purchase
+    # Checks that the content and user exist and that the user doesn't own
+    # the content yet in the same atomic step that records the purchase
+    try:
+        purchase = await db.purchase_if_not_owned(purchase_data)
+    except PurchaseError as ex:
+        logger.debug("Purchase refused", extra={"content_id": purchase_data.content_id, "error": str(ex)})
+        raise HTTPException(status_code=ex.status_code, detail=str(ex))
+    return FastJSONResponse(purchase)
 
 @router.get("/list_model_names", response_model=Dict[str, List[str]])
 async def list_model_names():
     """
     List available openai, atoma model names
     """
-    print('list_model_names: ', llm_service.models)
-    return llm_service.models
+    # Pre-serialized when the catalog changes, nothing to validate or encode here
+    return Response(content=llm_service.registry.snapshot, media_type="application/json")
 
-@router.post("/test_chat_completion", response_model=Dict)
-async def test_content(test_request: TestContentRequest):
+async def _resolve_test_request(
+    test_request: Union[TestContentRequest, BatchTestContentRequest]
+) -> Tuple[Optional[Content], str, Dict, str]:
     """
-    Test chat completion content with the LLM
+    Check access and work out which content, model, settings and system
+    prompt a chat completion test should use
     """
     content: Optional[Content] = None
 
-
     if test_request.content_id:
         if not test_request.user_id:
             raise HTTPException(status_code=400, detail="User ID is required")
         
         # see if the user has purchased the content
-        purchase = db.get_purchases_by_user(test_request.user_id)
-        # Example: [Purchase(user_id='1', content_id='e818ec76-08d0-4418-9925-3670e93964ab', id=1)]
-        has_purchased = any(p.content_id == test_request.content_id for p in purchase)
+        has_purchased = await db.has_purchased(test_request.user_id, test_request.content_id)
 
-        # print(f"* purchase: {purchase}, has_purchased: {has_purchased}")
         if not has_purchased: 
             raise HTTPException(status_code=403, detail="User has not purchased this content")
         
-        # print(f"* content_id is given")
-        content = db.get_content(test_request.content_id)
+        content = await db.get_content(test_request.content_id)
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
         
@@ -132,7 +156,7 @@ async def test_content(test_request: TestContentRequest):
         llm_model = content.llm_model
         system_prompt = content.description
     else:
-        print(f"* content_id is not given")
+        logger.debug("Testing without content_id")
         # Use the provided settings for a direct test
         if not test_request.llm_settings:
             raise HTTPException(
@@ -142,52 +166,143 @@ async def test_content(test_request: TestContentRequest):
         llm_settings = test_request.llm_settings
         llm_model = test_request.llm_model or DEFAULT_LLM_MODEL
         system_prompt = ""
-    
-    print(f"\n\n got request: {test_request}\n query:'{test_request.query}' using model: '{llm_model}' with settings: {llm_settings}")
+
+    return content, llm_model, llm_settings, system_prompt
+
+async def _record_test_result(content: Optional[Content], query: str, response: str):
+    # Tests of existing content go to its test history, the content itself is never rewritten
+    if content:
+        await db.add_test_result(TestResult(
+            content_id=str(content.id),
+            query=query,
+            response=response,
+            created_at=time.time()
+        ))
+
+@router.post("/test_chat_completion", response_model=Dict)
+async def test_content(test_request: TestContentRequest):
+    """
+    Test chat completion content with the LLM
+    """
+    content, llm_model, llm_settings, system_prompt = await _resolve_test_request(test_request)
+    logger.info("Test chat completion", extra={
+        "model": llm_model, "content_id": test_request.content_id,
+        "query_chars": len(test_request.query), "sample_rate": LOG_SAMPLE_RATE,
+    })
     # Generate a response using the LLM service
     response = await llm_service.test_prompt(
         test_request.query, 
         llm_model, 
         llm_settings,
-        system_prompt
+        system_prompt,
+        allow_cached=test_request.allow_cached
     )
     
-    # If using existing content, we can store test results in metadata
-    if content:
-        if not content.metadata:
-            content.metadata = {}
-        
-        if "test_results" not in content.metadata:
-            content.metadata["test_results"] = []
-            
-        test_result = {
-            "query": test_request.query,
-            "response": response
-        }
-        # In a real implementation, you might want to limit the number of results stored
-        content.metadata["test_results"].append(test_result)
-        
-        # Here we would update the content in the database
-        # This would require adding an update_content function to the database
+    await _record_test_result(content, test_request.query, response)
     
-    return {"response": response}
+    return FastJSONResponse({"response": response})
+
+def _sse_event(data: Dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/test_chat_completion/stream")
+async def test_content_stream(test_request: TestContentRequest):
+    """
+    Test chat completion content with the LLM, streaming tokens back as
+    server-sent events. Each `data:` event carries a `delta`, the stream ends
+    with a `done` event holding the full `response` (or an `error` event).
+    """
+    content, llm_model, llm_settings, system_prompt = await _resolve_test_request(test_request)
+    # Models that can't stream are refused here, with a 400 before the stream starts
+    stream = llm_service.stream_prompt(
+        test_request.query,
+        llm_model,
+        llm_settings,
+        system_prompt,
+        allow_cached=test_request.allow_cached
+    )
+
+    async def event_stream():
+        chunks = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield _sse_event({"delta": chunk})
+        except LLMProviderError as ex:
+            yield _sse_event({"detail": str(ex), "status_code": ex.status_code}, event="error")
+            return
+
+        response = "".join(chunks)
+        await _record_test_result(content, test_request.query, response)
+        yield _sse_event({"response": response}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/test_chat_completion/batch")
+async def test_content_batch(test_request: BatchTestContentRequest):
+    """
+    Run many queries against one content (or model) concurrently. Results are
+    streamed back as NDJSON, one `{"index", "query", "response"}` line per
+    query in completion order (`error` and `status_code` instead of
+    `response` if that query failed, provider and database errors alike).
+    Upstream concurrency is capped per provider.
+    """
+    content, llm_model, llm_settings, system_prompt = await _resolve_test_request(test_request)
+
+    async def run(index: int, query: str) -> Dict:
+        try:
+            response = await llm_service.test_prompt(
+                query,
+                llm_model,
+                llm_settings,
+                system_prompt,
+                allow_cached=test_request.allow_cached
+            )
+            await _record_test_result(content, query, response)
+        except LLMProviderError as ex:
+            return {"index": index, "query": query, "error": str(ex), "status_code": ex.status_code}
+        except DatabaseBusyError as ex:
+            return {"index": index, "query": query, "error": str(ex), "status_code": 503}
+        except sqlite3.Error:
+            logger.exception("Could not record batch test result", extra={"index": index})
+            return {"index": index, "query": query, "error": "Could not record the test result", "status_code": 500}
+        return {"index": index, "query": query, "response": response}
+
+    async def result_stream():
+        tasks = [asyncio.create_task(run(i, q)) for i, q in enumerate(test_request.queries)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # The client went away, don't keep spending on the rest
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
 
 @router.post("/test_image_gen", response_model=Dict)
 async def test_image_gen(test_request: TestImageRequest):
     """
     Test image generation content with the LLM to generate an image
     """
-    print(f"\n\n got request: {test_request}\n query:'{test_request.query}' using model: '{test_request.llm_model}' with settings: {test_request.llm_settings}")
-    
+    logger.info("Test image generation", extra={
+        "model": test_request.llm_model, "content_id": test_request.content_id,
+        "query_chars": len(test_request.query), "sample_rate": LOG_SAMPLE_RATE,
+    })
+
     if test_request.content_id:
         # see if the user has purchased the content
-        purchase = db.get_purchases_by_user(test_request.user_id)
-        has_purchased = any(p.content_id == test_request.content_id for p in purchase)
+        has_purchased = await db.has_purchased(test_request.user_id, test_request.content_id)
         
         if not has_purchased:
             raise HTTPException(status_code=403, detail="User has not purchased this content")
         
-        content = db.get_content(test_request.content_id)
+        content = await db.get_content(test_request.content_id)
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
         
@@ -200,12 +315,45 @@ async def test_image_gen(test_request: TestImageRequest):
         llm_model = test_request.llm_model or DEFAULT_IMAGE_MODEL
         system_prompt = ""
     
+    if test_request.background:
+        if WORKERS > 1:
+            # Jobs live in the worker that ran them, polls could land on any other
+            raise HTTPException(
+                status_code=400,
+                detail="Background image jobs need a single worker, retry with background=false"
+            )
+        # Reject models that can't draw now rather than in the job
+        llm_service.image_route(llm_model)
+        # Hand the call to a background job and let the client poll for it
+        try:
+            job = image_jobs.submit(llm_service.generate_image_async(
+                test_request.query,
+                llm_model,
+                llm_settings,
+                system_prompt
+            ))
+        except JobQueueFullError as ex:
+            raise HTTPException(status_code=503, detail=str(ex))
+        return JSONResponse(status_code=202, content=job.to_schema().model_dump())
+
     # Generate an image using the LLM service
-    response = llm_service.generate_image(
+    response = await llm_service.generate_image_async(
         test_request.query,
         llm_model,
         llm_settings,
         system_prompt
     )
     
-    return {"response": response}
\ No newline at end of file
+    return FastJSONResponse({"response": response})
+
+@router.get("/image_jobs/{job_id}", response_model=JobStatus)
+async def get_image_job(job_id: str, wait: float = Query(0, ge=0, le=IMAGE_JOB_MAX_WAIT)):
+    """
+    Get the status of a background image generation job. Pass `wait` (seconds)
+    to long-poll until the job finishes or the wait runs out.
+    """
+    job = image_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = await image_jobs.wait(job, wait)
+    return job.to_schema()
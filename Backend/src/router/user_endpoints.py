@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 
 from models.schemas import User, Purchase
 from database.db import db
+from constants import PURCHASES_DEFAULT_LIMIT, PURCHASES_MAX_LIMIT
+from utils.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -11,22 +13,31 @@ async def create_user(user: User):
     """
     Register a new user
     """
-    return db.add_user(user)
+    return await db.add_user(user)
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: str):
     """
     Get user information
     """
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.get("/{user_id}/purchases", response_model=List[Purchase])
-async def get_user_purchases(user_id: str):
+async def get_user_purchases(
+    user_id: str,
+    limit: int = Query(PURCHASES_DEFAULT_LIMIT, ge=1, le=PURCHASES_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
     """
-    Get a list of content purchased by a user
+    Get a list of content purchased by a user, oldest first. If there are
+    more, the `X-Next-Cursor` response header holds the `cursor` for the next page.
     """
-    purchases = db.get_purchases_by_user(user_id)
-    return purchases
\ No newline at end of file
+    try:
+        page = await db.get_purchases_page_by_user(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return FastJSONResponse(page.results, headers=headers)
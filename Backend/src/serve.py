@@ -0,0 +1,84 @@
+# serve.py
+"""
+Production launcher, configured from .env:
+
+    python serve.py
+
+WORKERS processes share the port. USE_SQLITE=False keeps one
+InMemoryDatabase per process, which workers can't share, so with more than
+one worker the data goes to a scratch SQLite database on tmpfs
+(SHARED_DB_DIR) instead: still memory backed and emptied on every start,
+but the same for every worker.
+
+Everything else stays per worker: the response cache, request coalescing,
+rate limiter buckets, circuit breakers and background image jobs. A job
+could be polled on a worker that never saw it, so background image
+generation is refused when WORKERS > 1.
+"""
+import atexit
+import os
+
+import uvicorn
+
+from constants import (
+    ACCESS_LOG, GRACEFUL_SHUTDOWN_TIMEOUT, HOST, KEEPALIVE_TIMEOUT, LOG_LEVEL, PORT, RELOAD, SHARED_DB_DIR,
+    UVICORN_HTTP, UVICORN_LOOP, USE_SQLITE, WORKERS
+)
+from impl import LoggerImpl, setup_logging
+
+logger = LoggerImpl(__name__).get_logger()
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def remove_database(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def shared_database_path() -> str:
+    """
+    Point the workers at an empty SQLite database on tmpfs. The workers are
+    separate processes started after this, they read it from the environment.
+    """
+    path = os.path.join(SHARED_DB_DIR, f"prompt_market-{PORT}.db")
+    remove_database(path)
+    atexit.register(remove_database, path)
+    os.environ["USE_SQLITE"] = "True"
+    os.environ["SQLITE_DB_PATH"] = path
+    return path
+
+
+def serve():
+    setup_logging()
+    workers = 1 if RELOAD else WORKERS
+    if RELOAD and WORKERS > 1:
+        logger.warning("RELOAD is on, starting a single worker", extra={"workers": WORKERS})
+    # The workers split per-process limits (provider quotas) by this
+    os.environ["WORKERS"] = str(workers)
+    if workers > 1 and not USE_SQLITE:
+        path = shared_database_path()
+        logger.info("In-memory database can't be shared between workers, using a tmpfs SQLite database",
+                    extra={"path": path, "workers": workers})
+
+    uvicorn.run(
+        "main:app",
+        app_dir=SRC_DIR,
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        reload=RELOAD,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE_TIMEOUT,
+        access_log=ACCESS_LOG,
+        log_level=LOG_LEVEL.lower(),
+        # Leave uvicorn's loggers to the app's logging setup (JSON, request ids)
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    serve()
@@ -4,8 +4,19 @@ from dotenv import load_dotenv
 import os
 load_dotenv()
 
+import httpx
 from atoma_sdk import AtomaSDK
-from constants import DEFAULT_LLM_SETTINGS
+from constants import (
+    DEFAULT_LLM_SETTINGS, ATOMA_CONNECT_TIMEOUT, ATOMA_KEEPALIVE_EXPIRY, ATOMA_MAX_CONNECTIONS,
+    ATOMA_MAX_KEEPALIVE_CONNECTIONS, ATOMA_TIMEOUT
+)
+from services.errors import provider_error
+from services.think_filter import ThinkTagFilter
+from utils.metrics import record_usage
+
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
 
 '''
 DEFAULT_LLM_SETTINGS = {
@@ -24,124 +35,148 @@ class AtomaAPI:
         assert atoma_api_token !=None, "No atoma bearer found in .env"
         self.atoma_api_token = atoma_api_token
 
-        print('Initializing atoma models list...', end='')
-        self.models_list = self.get_models_list()
-        print('done.')
+        # One SDK instance (with one sync and one async connection pool) for
+        # the whole process, so calls reuse kept-alive TLS connections
+        # instead of paying for a new handshake every time.
+        limits = httpx.Limits(
+            max_connections=ATOMA_MAX_CONNECTIONS,
+            max_keepalive_connections=ATOMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ATOMA_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(ATOMA_TIMEOUT, connect=ATOMA_CONNECT_TIMEOUT)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_client_async = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self.atoma_sdk = AtomaSDK(
+            bearer_auth=self.atoma_api_token,
+            client=self.http_client,
+            async_client=self.http_client_async,
+            timeout_ms=int(ATOMA_TIMEOUT * 1000),
+        )
     
+    async def aclose(self):
+        """Close the shared connection pools"""
+        self.http_client.close()
+        await self.http_client_async.aclose()
+
     def get_models_list(self):
         atoma_models = []
         try:
-            with AtomaSDK(
-                bearer_auth=self.atoma_api_token,
-            ) as atoma_sdk:
-                res = atoma_sdk.models_.models_list()
-                # Handle response
-                # print(res)
-                for model in res.data:
-                    atoma_models.append(model.id)
-                return atoma_models
-                # print(atoma_models)
+            res = self.atoma_sdk.models_.models_list()
+            # Handle response
+            # print(res)
+            for model in res.data:
+                atoma_models.append(model.id)
+            return atoma_models
+            # print(atoma_models)
         except Exception as ex:
-            print(ex)
+            logger.warning("Could not list atoma models", extra={"error": str(ex)})
             return []
 
+    async def get_models_list_async(self):
+        """Fetch the model ids without blocking the event loop"""
+        res = await self.atoma_sdk.models_.models_list_async()
+        return [model.id for model in res.data]
+
+    def _chat_request(self, query, model_name, llm_settings):
+        """Keyword arguments for a chat completion call"""
+        return dict(
+            messages=[
+                {
+                    "content": query,
+                    "role": "user",
+                },
+            ],
+            model=model_name,
+            frequency_penalty=llm_settings.get('frequency_penalty', 0.0),
+            max_tokens=llm_settings.get('max_tokens', 1024),
+            n=llm_settings.get('n', 1),
+            presence_penalty=llm_settings.get('presence_penalty', 0.0),
+            seed=123,
+            stop=[
+                "json([\"stop\", \"halt\"])",
+            ],
+            temperature=llm_settings.get('temperature', 0.7),
+            top_p=llm_settings.get('top_p', 1.0),
+            user="user-1234"
+        )
+
     async def query_atoma_async(self, query, model_name, llm_settings=DEFAULT_LLM_SETTINGS, exclude_thinking_text=True,):
-        print(f"atoma: query_atoma_async: {query}, {model_name}, {llm_settings}, {exclude_thinking_text}")
+        logger.debug("atoma chat completion", extra={"model": model_name, "prompt_chars": len(query)})
         try:
-            async with AtomaSDK(  # Use async with
-                bearer_auth=self.atoma_api_token,
-            ) as atoma_sdk:
-                res = await atoma_sdk.chat.create_async(  # Use create_async and await
-                    messages=[
-                        {
-                            "content": query,
-                            "role": "user",
-                        },
-                    ],
-                    model=model_name,
-                    frequency_penalty=llm_settings.get('frequency_penalty', 0.0),
-                    max_tokens=llm_settings.get('max_tokens', 1024),
-                    n=llm_settings.get('n', 1),
-                    presence_penalty=llm_settings.get('presence_penalty', 0.0),
-                    seed=123,
-                    stop=[
-                        "json([\"stop\", \"halt\"])",
-                    ],
-                    temperature=llm_settings.get('temperature', 0.7),
-                    top_p=llm_settings.get('top_p', 1.0),
-                    user="user-1234"
-                )
-
-                # deepseek r1 have option to include thinking text
-                if 'r1' in model_name and exclude_thinking_text:
-                    # Remove thinking text from r1 model
-                    return res.choices[0].message.content.split('</think>')[-1].strip()
-
-                # llm response without any modifications.
-                return res.choices[0].message.content
+            res = await self.atoma_sdk.chat.create_async(  # Use create_async and await
+                **self._chat_request(query, model_name, llm_settings)
+            )
+            record_usage("atoma", model_name, getattr(res, "usage", None))
+
+            # deepseek r1 have option to include thinking text
+            if 'r1' in model_name and exclude_thinking_text:
+                # Remove thinking text from r1 model
+                return res.choices[0].message.content.split('</think>')[-1].strip()
+
+            # llm response without any modifications.
+            return res.choices[0].message.content
         except Exception as ex:
-            print(f' error query llm: {ex}')
-            return f"error query llm: {ex}"
+            logger.warning("atoma chat completion failed", extra={"model": model_name, "error": str(ex)})
+            raise provider_error("atoma", f"error query llm: {ex}", ex) from ex
+
+    async def stream_atoma_async(self, query, model_name, llm_settings=DEFAULT_LLM_SETTINGS, exclude_thinking_text=True):
+        """Async generator yielding the completion text as it is produced"""
+        logger.debug("atoma chat completion stream", extra={"model": model_name, "prompt_chars": len(query)})
+        think_filter = ThinkTagFilter() if 'r1' in model_name and exclude_thinking_text else None
+        try:
+            res = await self.atoma_sdk.chat.create_stream_async(
+                **self._chat_request(query, model_name, llm_settings)
+            )
+            async with res as event_stream:
+                async for event in event_stream:
+                    for choice in event.data.choices:
+                        delta = choice.delta.content
+                        if not delta:
+                            continue
+                        if think_filter:
+                            delta = think_filter.feed(delta)
+                        if delta:
+                            yield delta
+            if think_filter:
+                tail = think_filter.flush()
+                if tail:
+                    yield tail
+        except Exception as ex:
+            logger.warning("atoma chat completion stream failed", extra={"model": model_name, "error": str(ex)})
+            raise provider_error("atoma", f"error query llm: {ex}", ex) from ex
 
     def query_atoma(self, query, model_name, llm_settings = DEFAULT_LLM_SETTINGS, exclude_thinking_text=True):
-        print(f"atoma: query: {query}, model_name: {model_name}, llm_settings: {llm_settings}")
+        logger.debug("atoma chat completion", extra={"model": model_name, "prompt_chars": len(query)})
         try:
-            with AtomaSDK(
-                bearer_auth=self.atoma_api_token,
-            ) as atoma_sdk:
-                res = atoma_sdk.chat.create(messages=[
-                    {
-                        "content": query,
-                        "role": "user",
-                    },
-                ],
-                
-                model=model_name,
-                frequency_penalty=llm_settings.get('frequency_penalty', 0.0),
-                max_tokens=llm_settings.get('max_tokens', 1024),
-                n=llm_settings.get('n', 1),
-                presence_penalty=llm_settings.get('presence_penalty', 0.0),
-                seed=123,
-                stop=[
-                    "json([\"stop\", \"halt\"])",
-                ],
-                temperature=llm_settings.get('temperature', 0.7),
-                top_p=llm_settings.get('top_p', 1.0),
-                user="user-1234")
-                
-                # deepseek r1 have option to include thinking text
-                if 'r1' in model_name and not exclude_thinking_text:
-                    # Remove thinking text from r1 model
-                    return res.choices[0].message.content.split('</think>')[-1].strip()
-                
-                # llm response without any modifications.
-                return res.choices[0].message.content
+            res = self.atoma_sdk.chat.create(**self._chat_request(query, model_name, llm_settings))
+            
+            # deepseek r1 have option to include thinking text
+            if 'r1' in model_name and not exclude_thinking_text:
+                # Remove thinking text from r1 model
+                return res.choices[0].message.content.split('</think>')[-1].strip()
+            
+            # llm response without any modifications.
+            return res.choices[0].message.content
         except Exception as ex:
-            print(f' error query llm: {ex}')
+            logger.warning("atoma chat completion failed", extra={"model": model_name, "error": str(ex)})
             return f"error query llm: {ex}"
     
     def generate_image(self, model_name="black-forest-labs/FLUX.1-schnell", prompt="A cute baby sea otter floating on its back"):
         try:
-            with AtomaSDK(
-                    bearer_auth=self.atoma_api_token,
-            ) as atoma_sdk:
-
-                res = atoma_sdk.images.generate(
-                    model=model_name,
-                    prompt=prompt,
-                    n=1,
-                    quality="hd",
-                    response_format="url",
-                    size="1024x1024",
-                    style="vivid",
-                    user="user-1234"
-                )
-                
-                # Handle response
-                print(res)
-                return res
+            res = self.atoma_sdk.images.generate(
+                model=model_name,
+                prompt=prompt,
+                n=1,
+                quality="hd",
+                response_format="url",
+                size="1024x1024",
+                style="vivid",
+                user="user-1234"
+            )
+            
+            return res
         except Exception as ex:
-            print(f' error generate image: {ex}')
+            logger.warning("atoma image generation failed", extra={"model": model_name, "error": str(ex)})
             return f"error generate image: {ex}"
 
 
@@ -152,7 +187,7 @@ if __name__ == "__main__":
     atoma_api = AtomaAPI()
     
     # list models
-    print(f'models list: {atoma_api.models_list}')
+    print(f'models list: {atoma_api.get_models_list()}')
     
     # normal request
     response = atoma_api.query_atoma('hi!','neuralmagic/DeepSeek-R1-Distill-Llama-70B-FP8-dynamic')
@@ -0,0 +1,83 @@
+# bulk.py
+from typing import AsyncIterator, Dict, Generic, List, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel, ValidationError
+
+from constants import BULK_CHUNK_SIZE, BULK_MAX_ERRORS
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class NDJSONImport(Generic[Model]):
+    """
+    Parses an NDJSON import line by line into batches of `model`.
+
+    `feed` hands back a full batch every `chunk_size` records for the
+    caller to write in one transaction, `finish` returns the remainder. Bad
+    lines (and batches the database rejected, see `failed`) are counted
+    and the first `max_errors` of them are kept for the report, so one
+    broken record never aborts a large import.
+    """
+    def __init__(self, model: Type[Model], chunk_size: int = BULK_CHUNK_SIZE,
+                 max_errors: int = BULK_MAX_ERRORS):
+        self.model = model
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.batch: List[Model] = []
+        self.batch_start = 1
+        self._batch_lines = ""
+        self.line_no = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+
+    def _error(self, lines: str, message: str, count: int = 1):
+        self.failed += count
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"lines": lines, "error": message})
+
+    def feed(self, line: Union[bytes, str]) -> Optional[List[Model]]:
+        self.line_no += 1
+        if not line.strip():
+            return None
+        try:
+            self.batch.append(self.model.model_validate_json(line))
+        except ValidationError as ex:
+            self._error(str(self.line_no), str(ex.errors(include_url=False)[0]["msg"]))
+            return None
+        if len(self.batch) >= self.chunk_size:
+            return self.finish()
+        return None
+
+    def finish(self) -> List[Model]:
+        batch, self.batch = self.batch, []
+        self._batch_lines = f"{self.batch_start}-{self.line_no}"
+        self.batch_start = self.line_no + 1
+        return batch
+
+    def written(self, count: int):
+        self.imported += count
+
+    def rejected(self, batch: List[Model], ex: Exception):
+        self._error(self._batch_lines, str(ex), len(batch))
+
+    def report(self) -> Dict:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines without buffering all of it"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def to_ndjson(records: List[BaseModel]) -> bytes:
+    """One export batch as NDJSON"""
+    return "".join(record.model_dump_json() + "\n" for record in records).encode()
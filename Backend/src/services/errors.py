@@ -0,0 +1,64 @@
+# errors.py
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+class LLMProviderError(Exception):
+    """Raised when a call to an upstream LLM provider (Atoma, OpenAI) fails"""
+    status_code = 502
+
+    def __init__(self, provider: str, message: str, upstream_status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.upstream_status = upstream_status
+        self.retry_after = retry_after
+
+
+class UnsupportedModelError(LLMProviderError):
+    """The model can't serve the request (e.g. an image model asked to chat)"""
+    status_code = 400
+
+
+class RateLimitExceeded(LLMProviderError):
+    """The provider quota is used up for longer than a request may wait"""
+    status_code = 429
+
+
+class ProviderOverloaded(LLMProviderError):
+    """Too many requests are already queued for the provider"""
+    status_code = 503
+
+
+class CircuitOpenError(LLMProviderError):
+    """The provider is failing or too slow and is skipped until it recovers"""
+    status_code = 503
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def provider_error(provider: str, message: str, ex: Exception) -> LLMProviderError:
+    """
+    Wrap an SDK exception, keeping the upstream status code and Retry-After
+    hint when the SDK exposes them (openai.APIStatusError, atoma_sdk APIError).
+    """
+    status = getattr(ex, "status_code", None)
+    response = getattr(ex, "response", None) or getattr(ex, "raw_response", None)
+    headers: Mapping[str, str] = getattr(response, "headers", None) or {}
+    retry_after = parse_retry_after(headers.get("retry-after"))
+    if status == 429:
+        return RateLimitExceeded(provider, message, status, retry_after)
+    return LLMProviderError(provider, message, status, retry_after)
@@ -0,0 +1,108 @@
+# fake_api.py
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from constants import (
+    FAKE_LLM_ERROR_RATE, FAKE_LLM_ERROR_STATUS, FAKE_LLM_LATENCY, FAKE_LLM_MODELS, FAKE_LLM_RESPONSE_TOKENS,
+    FAKE_LLM_SEED
+)
+from services.errors import LLMProviderError, RateLimitExceeded
+from utils.metrics import record_usage
+
+_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit",
+          "sed", "do", "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore")
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Sampler for a latency spec such as "fixed:0.05", "uniform:0.1,0.4",
+    "normal:0.3,0.1", "lognormal:0.3,0.5" (median, sigma) or "exponential:0.3".
+    Samples are in seconds and never negative.
+    """
+    kind, _, args = spec.partition(":")
+    try:
+        params = [float(arg) for arg in args.split(",")] if args else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec {spec!r}") from None
+
+    distributions = {
+        "fixed": (1, lambda value: value),
+        "uniform": (2, rng.uniform),
+        "normal": (2, rng.gauss),
+        "lognormal": (2, lambda median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        "exponential": (1, lambda mean: rng.expovariate(1 / mean)),
+    }
+    if kind not in distributions or len(params) != distributions[kind][0]:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    sample = distributions[kind][1]
+    return lambda: max(0.0, sample(*params))
+
+
+class FakeLLMAPI:
+    """
+    Local stand-in for the Atoma and OpenAI clients (LLM_BACKEND=fake).
+
+    Answers after a delay drawn from FAKE_LLM_LATENCY and fails
+    FAKE_LLM_ERROR_RATE of the calls with FAKE_LLM_ERROR_STATUS, so the
+    routing, rate limiting, circuit breakers and the routes themselves can be
+    load tested without paying for (or waiting on) the real providers.
+    """
+    def __init__(self, latency: str = FAKE_LLM_LATENCY, error_rate: float = FAKE_LLM_ERROR_RATE,
+                 error_status: int = FAKE_LLM_ERROR_STATUS, response_tokens: int = FAKE_LLM_RESPONSE_TOKENS,
+                 models: Dict[str, List[str]] = FAKE_LLM_MODELS, seed: Optional[int] = FAKE_LLM_SEED):
+        self.rng = random.Random(seed)
+        self.sample_latency = parse_latency(latency, self.rng)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.response_tokens = response_tokens
+        self.models = models
+
+    async def aclose(self):
+        pass
+
+    async def get_models_list_async(self, provider: str) -> List[str]:
+        return list(self.models.get(provider, []))
+
+    def _maybe_fail(self, provider: str, model_name: str):
+        if self.rng.random() >= self.error_rate:
+            return
+        message = f"fake {provider} error for {model_name}"
+        if self.error_status == 429:
+            raise RateLimitExceeded(provider, message, 429, retry_after=1.0)
+        raise LLMProviderError(provider, message, self.error_status)
+
+    def _words(self) -> List[str]:
+        return [self.rng.choice(_WORDS) for _ in range(self.response_tokens)]
+
+    async def query_async(self, provider: str, query: str, model_name: str, llm_settings: Optional[Dict]) -> str:
+        await asyncio.sleep(self.sample_latency())
+        self._maybe_fail(provider, model_name)
+        words = self._words()
+        record_usage(provider, model_name, SimpleNamespace(
+            prompt_tokens=max(1, len(query) // 4), completion_tokens=len(words)
+        ))
+        return " ".join(words)
+
+    async def stream_async(self, provider: str, query: str, model_name: str,
+                           llm_settings: Optional[Dict]) -> AsyncIterator[str]:
+        """Yields the words spread evenly over the sampled latency"""
+        words = self._words()
+        delay = self.sample_latency() / (len(words) or 1)
+        await asyncio.sleep(delay)
+        self._maybe_fail(provider, model_name)
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(delay)
+            yield word if index == 0 else f" {word}"
+        record_usage(provider, model_name, SimpleNamespace(
+            prompt_tokens=max(1, len(query) // 4), completion_tokens=len(words)
+        ))
+
+    async def generate_image_async(self, provider: str, query: str, model_name: str,
+                                   llm_settings: Optional[Dict]) -> str:
+        await asyncio.sleep(self.sample_latency())
+        self._maybe_fail(provider, model_name)
+        return f"https://example.invalid/fake-images/{self.rng.getrandbits(64):016x}.png"
@@ -0,0 +1,102 @@
+# jobs.py
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Dict, Optional, Set
+
+from constants import IMAGE_JOB_TTL, IMAGE_MAX_JOBS
+from models.schemas import JobStatus
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are still pending to accept another one"""
+
+
+class Job:
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+        self.status = "pending"
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_schema(self) -> JobStatus:
+        return JobStatus(id=self.id, status=self.status, response=self.result, error=self.error)
+
+
+class JobManager:
+    """
+    Runs long provider calls (image generation) in the background.
+
+    Submitting returns a Job immediately; clients poll it by id or wait on
+    it with a timeout. Finished jobs are kept for `ttl` seconds and at most
+    `max_jobs` jobs are tracked at once. State lives in this process only,
+    so test_image_gen refuses background jobs when serving with WORKERS > 1.
+    """
+    def __init__(self, max_jobs: int = IMAGE_MAX_JOBS, ttl: float = IMAGE_JOB_TTL):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def submit(self, work: Awaitable[str]) -> Job:
+        self._prune()
+        if len(self.jobs) >= self.max_jobs:
+            # Don't leave the coroutine un-awaited
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise JobQueueFullError(f"Too many jobs in flight ({len(self.jobs)})")
+
+        job = Job()
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, work))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, work: Awaitable[str]):
+        try:
+            job.result = await work
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as ex:
+            job.error = str(ex)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.done.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to `timeout` seconds for the job to finish (long polling)"""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def cancel_all(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Background image generation jobs
+image_jobs = JobManager()
@@ -1,33 +1,153 @@
-from typing import Dict, Optional
+import asyncio
+import functools
+import time
+from typing import AsyncIterator, Dict, Optional
 from services.atoma.atoma_api import AtomaAPI
 from services.openai.openai_api import OpenaiAPI
+from services.errors import CircuitOpenError, LLMProviderError, RateLimitExceeded, UnsupportedModelError
+from services.fake.fake_api import FakeLLMAPI
+from services.model_catalog import ModelCatalog
+from services.model_registry import PROVIDERS, ModelInfo, ModelRegistry
+from services.provider_health import ProviderHealth
+from services.rate_limiter import RateLimiter, estimate_tokens
+from services.response_cache import ResponseCache, request_fingerprint
+from utils.metrics import llm_request_duration, llm_request_errors, metrics
+from utils.singleflight import SingleFlight
+
+from constants import (
+    DEFAULT_LLM_MODEL, DEFAULT_LLM_SETTINGS, IMAGE_MAX_CONCURRENCY, ATOMA_MAX_CONCURRENCY,
+    OPENAI_MAX_CONCURRENCY, MODEL_ALIASES, MODEL_MAX_TOKENS, RATE_LIMIT_MAX_RETRIES, MODEL_FALLBACKS,
+    HEDGE_ENABLED, HEDGE_BUDGET, LLM_BACKEND, MODEL_CATALOG_CACHE_PATH
+)
+
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
+
+
+def _record_error(route: ModelInfo, ex: LLMProviderError):
+    llm_request_errors.inc((route.provider, route.name, str(ex.upstream_status or ex.status_code)))
+
+
+def _is_provider_fault(ex: LLMProviderError) -> bool:
+    """Failures that say something about the provider's health (not 4xx / quota)"""
+    return not isinstance(ex, RateLimitExceeded) and (ex.upstream_status is None or ex.upstream_status >= 500)
 
-from constants import DEFAULT_LLM_MODEL, DEFAULT_LLM_SETTINGS
 
 class LLMService:
     def __init__(self):
-        # This is a placeholder for a real LLM service integration
-        self.atoma_api = AtomaAPI()
-        self.openai_api = OpenaiAPI()
+        if LLM_BACKEND == 'fake':
+            # Local stand-in answering for every provider, nothing leaves the process
+            self.fake_api = FakeLLMAPI()
+            self.atoma_api = self.openai_api = None
+            fetchers = {
+                provider: functools.partial(self.fake_api.get_models_list_async, provider) for provider in PROVIDERS
+            }
+            catalog_cache_path = None
+        else:
+            self.fake_api = None
+            self.atoma_api = AtomaAPI()
+            self.openai_api = OpenaiAPI()
+            fetchers = {
+                'atoma': self.atoma_api.get_models_list_async,
+                'openai': self.openai_api.get_models_list_async
+            }
+            catalog_cache_path = MODEL_CATALOG_CACHE_PATH
 
-        self.models = {
-            'atoma': self.atoma_api.models_list,
-            'openai': self.openai_api.models_list
+        # Routing table, filled in the background once the app starts (see start())
+        self.registry = ModelRegistry(DEFAULT_LLM_MODEL, aliases=MODEL_ALIASES, max_tokens=MODEL_MAX_TOKENS)
+        self.catalog = ModelCatalog(fetchers, cache_path=catalog_cache_path, on_update=self.registry.update)
+
+        self.response_cache = ResponseCache()
+        self.inflight = SingleFlight()
+        self.rate_limiter = RateLimiter()
+        self.image_semaphore = asyncio.Semaphore(IMAGE_MAX_CONCURRENCY)
+        # Separate caps so a burst against one provider can't starve the other
+        self.provider_semaphores = {
+            'atoma': asyncio.Semaphore(ATOMA_MAX_CONCURRENCY),
+            'openai': asyncio.Semaphore(OPENAI_MAX_CONCURRENCY),
         }
+        # Latency percentiles and circuit breakers, drive failover and hedging
+        self.health = {provider: ProviderHealth() for provider in PROVIDERS}
+        self.failovers = 0
+        self.hedge_candidates = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._register_metrics()
     
-    async def generate_response(self, query: str, model: str, settings: Dict) -> str:
-        """
-        Generate a response using an LLM model.
-        
-        In a real implementation, this would call an actual API like OpenAI, Anthropic, etc.
-        For this example, we're just returning a mock response.
-        """
-        # This is a placeholder implementation
-        print(f"\n\n Generating response for query: '{query}' using model: '{model}' with settings: {settings}")
+    def _register_metrics(self):
+        """Expose the caches', limiter's and breakers' own counters on /metrics"""
+        metrics.callback(
+            "llm_response_cache_requests_total", "Response cache lookups", ("result",),
+            lambda: {
+                (result,): self.response_cache.stats()[key]
+                for result, key in (("hit", "hits"), ("miss", "misses"), ("skipped", "skipped"))
+            },
+            kind="counter"
+        )
+        metrics.callback(
+            "llm_response_cache_hit_ratio", "Response cache hits per lookup", (),
+            lambda: {(): self.response_cache.stats()["hit_ratio"]}
+        )
+        metrics.callback(
+            "llm_response_cache_entries", "Responses currently cached", (),
+            lambda: {(): self.response_cache.stats()["size"]}
+        )
+        metrics.callback(
+            "llm_singleflight_calls_total", "Identical in-flight requests, executed or coalesced", ("result",),
+            lambda: {
+                ("executed",): self.inflight.stats()["executions"],
+                ("coalesced",): self.inflight.stats()["coalesced"],
+            },
+            kind="counter"
+        )
+        metrics.callback(
+            "llm_rate_limiter_events_total", "Calls delayed or rejected by the rate limiter", ("event",),
+            lambda: {(key,): self.rate_limiter.stats()[key] for key in ("throttled", "rejected")},
+            kind="counter"
+        )
+        metrics.callback(
+            "llm_rate_limiter_waiting", "Calls waiting for rate limit capacity", (),
+            lambda: {(): self.rate_limiter.stats()["waiting"]}
+        )
+        metrics.callback(
+            "llm_provider_circuit_open", "1 while a provider's circuit breaker is open or half-open", ("provider",),
+            lambda: {
+                (provider,): int(health.breaker.state != "closed") for provider, health in self.health.items()
+            }
+        )
+        metrics.callback(
+            "llm_resilience_events_total", "Failovers to fallback models, hedges sent and hedges won", ("event",),
+            lambda: {("failover",): self.failovers, ("hedge",): self.hedges, ("hedge_win",): self.hedge_wins},
+            kind="counter"
+        )
+        metrics.callback(
+            "llm_unknown_models_total", "Requests for models missing from the catalogs, refused or passed through before load",
+            ("outcome",),
+            lambda: {("refused",): self.registry.unknown, ("passed_through",): self.registry.unverified},
+            kind="counter"
+        )
+
+    def start(self):
+        """Start loading the model catalogs, called on application startup"""
+        self.catalog.start()
+
+    async def aclose(self):
+        """Release the provider clients, called on application shutdown"""
+        await self.catalog.stop()
+        for api in (self.fake_api, self.atoma_api, self.openai_api):
+            if api is not None:
+                await api.aclose()
 
-        return f"This is a simulated response from model {model} to the query: '{query}'"
+    async def _query_route(self, route: ModelInfo, query: str, llm_settings: Dict) -> str:
+        if self.fake_api is not None:
+            return await self.fake_api.query_async(route.provider, query, route.name, llm_settings)
+        if route.provider == 'atoma':
+            return await self.atoma_api.query_atoma_async(query, route.name, llm_settings)
+        return await self.openai_api.query_openai_async(query, route.name, llm_settings)
     
-    async def test_prompt(self, query: str, llm_model: str, llm_settings: Dict, system_prompt: Optional[str] = None) -> str:
+    async def test_prompt(self, query: str, llm_model: str, llm_settings: Dict, system_prompt: Optional[str] = None,
+                          allow_cached: bool = False) -> str:
         """
         Test a prompt with a specific model and settings.
         
@@ -36,37 +156,274 @@ class LLMService:
             llm_model: The LLM model to use
             llm_settings: Configuration for the LLM call
             system_prompt: Optional system prompt to use
+            allow_cached: Serve and store cached responses even when the
+                settings are non-deterministic (temperature > 0)
+
+        Raises UnsupportedModelError for non-chat models and LLMProviderError
+        (RateLimitExceeded / ProviderOverloaded when over quota) if the
+        provider call fails.
         """
-        
-        print(f"\n\n Testing prompt: '{query}' using model: '{llm_model}' with settings: {llm_settings}")
+        logger.debug("Testing prompt", extra={"model": llm_model, "prompt_chars": len(query)})
+        route = self.chat_route(llm_model)
 
+        request_key = request_fingerprint(route.name, llm_settings, system_prompt, query)
+        use_cache = self.response_cache.cacheable(llm_settings, allow_cached)
+        if use_cache:
+            cached = self.response_cache.get(request_key)
+            if cached is not None:
+                return cached
 
         if system_prompt:
             # In a real implementation, we would decrypt and use the system prompt
-            print(f"System prompt: {system_prompt}")
             query = f"{system_prompt}\n user-query: {query}"
-        
-        if llm_model in self.models['atoma']:
-            # return await self.generate_response(query, llm_model, llm_settings)
-            return await self.atoma_api.query_atoma_async(query, llm_model, llm_settings)
 
-        # elif llm_model in self.models['openai'] and llm_model in ["dall-e-3", "dall-e-2"]:
-        #     # return await self.generate_response(query, llm_model, llm_settings)
-        #     return await self.openai_api.generate_image(query, llm_model, llm_settings)
-        
-        elif llm_model in self.models['openai']:
-            # return await self.generate_response(query, llm_model, llm_settings)
-            return await self.openai_api.query_openai_async(query, llm_model)
-        
-        # gpt-4o-mini is cheap model so using it as default.
-        return await self.openai_api.query_openai_async(query, DEFAULT_LLM_MODEL, llm_settings)
+        # Identical requests already in flight share the same upstream call.
+        # Provider failures propagate as LLMProviderError and are never cached.
+        response = await self.inflight.do(
+            request_key,
+            lambda: self._query_provider(query, route, llm_settings)
+        )
+
+        if use_cache:
+            self.response_cache.set(request_key, response)
+        return response
+
+    def chat_route(self, llm_model: str, streaming: bool = False) -> ModelInfo:
+        """
+        Route for a chat completion with `llm_model`, raises
+        UnsupportedModelError if the model can't chat (or stream)
+        """
+        route = self.registry.resolve(llm_model)
+        if route.kind != "chat":
+            raise UnsupportedModelError(route.provider, f"{route.name} is an {route.kind} model, not a chat model")
+        if streaming and not route.streaming:
+            raise UnsupportedModelError(route.provider, f"{route.name} does not support streaming")
+        return route
+
+    def image_route(self, llm_model: str) -> ModelInfo:
+        """Route for image generation with `llm_model`, raises UnsupportedModelError if it can't draw"""
+        route = self.registry.resolve(llm_model)
+        if route.kind != "image":
+            raise UnsupportedModelError(route.provider, f"{route.name} is a {route.kind} model, not an image model")
+        if route.provider != 'openai' and self.fake_api is None:
+            raise UnsupportedModelError(route.provider, f"Image generation is not available through {route.provider}")
+        return route
+
+    async def _query_provider(self, query: str, route: ModelInfo, llm_settings: Dict) -> str:
+        """
+        Send a query to the model's provider, with failover and hedging.
+
+        While the provider's circuit is open the configured fallback model
+        answers instead. With HEDGE_ENABLED, a call that outlives the
+        provider's p95 latency is raced against the fallback model and the
+        slower call is cancelled; a failed call is retried on the fallback.
+        """
+        fallback = self._fallback_route(route)
+
+        if not self.health[route.provider].breaker.allow():
+            if fallback is None or not self.health[fallback.provider].breaker.allow():
+                raise CircuitOpenError(
+                    route.provider, f"{route.provider} is unavailable, retry later",
+                    retry_after=self.health[route.provider].breaker.retry_after()
+                )
+            self.failovers += 1
+            return await self._call_route(fallback, query, llm_settings)
+
+        delay = self.health[route.provider].hedge_delay() if HEDGE_ENABLED and fallback else None
+        if delay is None:
+            try:
+                return await self._call_route(route, query, llm_settings)
+            except LLMProviderError as ex:
+                if fallback is None or not _is_provider_fault(ex) or not self.health[fallback.provider].breaker.allow():
+                    raise
+                self.failovers += 1
+                return await self._call_route(fallback, query, llm_settings)
+        return await self._hedged_call(route, fallback, delay, query, llm_settings)
+
+    async def _hedged_call(self, route: ModelInfo, fallback: ModelInfo, delay: float,
+                           query: str, llm_settings: Dict) -> str:
+        self.hedge_candidates += 1
+        primary = asyncio.create_task(self._call_route(route, query, llm_settings))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                error = primary.exception()
+                if (error is None or not _is_provider_fault(error)
+                        or not self.health[fallback.provider].breaker.allow()):
+                    return primary.result()
+                self.failovers += 1
+                return await self._call_route(fallback, query, llm_settings)
+
+            # Hedge only a small share of calls so slow spells don't double the cost
+            if (self.hedges < HEDGE_BUDGET * self.hedge_candidates
+                    and self.health[fallback.provider].breaker.allow()):
+                self.hedges += 1
+                tasks.add(asyncio.create_task(self._call_route(fallback, query, llm_settings)))
+
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the loser (or both if we were cancelled ourselves)
+            for task in tasks:
+                task.cancel()
+
+    async def _call_route(self, route: ModelInfo, query: str, llm_settings: Dict) -> str:
+        """One upstream call under the rate limiter, recorded in the provider's health"""
+        health = self.health[route.provider]
+        llm_settings = route.clamp_settings(llm_settings)
+        tokens = estimate_tokens(query, llm_settings)
+        try:
+            for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+                await self.rate_limiter.acquire(route.provider, route.name, tokens)
+                try:
+                    async with self.provider_semaphores[route.provider]:
+                        # Timed from here so waiting behind our own cap isn't blamed on the provider
+                        started = time.monotonic()
+                        response = await self._query_route(route, query, llm_settings)
+                except RateLimitExceeded as ex:
+                    # The provider pushed back despite our quota, pause it and retry
+                    _record_error(route, ex)
+                    self.rate_limiter.backoff(route.provider, route.name, ex.retry_after)
+                    if attempt == RATE_LIMIT_MAX_RETRIES:
+                        raise
+                    continue
+                except LLMProviderError as ex:
+                    _record_error(route, ex)
+                    if _is_provider_fault(ex):
+                        health.record(False)
+                    raise
+                latency = time.monotonic() - started
+                llm_request_duration.observe((route.provider, route.name, "chat"), latency)
+                health.record(True, latency)
+                self.rate_limiter.record_success(route.provider)
+                return response
+        except BaseException:
+            # Quota errors, 4xx and lost hedge races say nothing about the
+            # provider's health, free the half-open probe for the next call
+            health.breaker.release()
+            raise
+
+    def _fallback_route(self, route: ModelInfo) -> Optional[ModelInfo]:
+        fallback = MODEL_FALLBACKS.get(route.name)
+        return self.registry.get(fallback) if fallback else None
+
+    def stream_prompt(self, query: str, llm_model: str, llm_settings: Dict, system_prompt: Optional[str] = None,
+                      allow_cached: bool = False) -> AsyncIterator[str]:
+        """
+        Streaming variant of `test_prompt`, the returned iterator yields the
+        response text as the provider produces it and raises LLMProviderError
+        if the provider fails. Raises UnsupportedModelError right away for
+        models that can't stream, before anything is sent.
+        """
+        logger.debug("Streaming prompt", extra={"model": llm_model, "prompt_chars": len(query)})
+        route = self.chat_route(llm_model, streaming=True)
+        return self._stream_route(route, query, llm_settings, system_prompt, allow_cached)
+
+    async def _stream_route(self, route: ModelInfo, query: str, llm_settings: Dict,
+                            system_prompt: Optional[str], allow_cached: bool) -> AsyncIterator[str]:
+        cache_key = None
+        if self.response_cache.cacheable(llm_settings, allow_cached):
+            cache_key = request_fingerprint(route.name, llm_settings, system_prompt, query)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        if system_prompt:
+            query = f"{system_prompt}\n user-query: {query}"
+
+        if not self.health[route.provider].breaker.allow():
+            fallback = self._fallback_route(route)
+            if fallback is None or not self.health[fallback.provider].breaker.allow():
+                raise CircuitOpenError(
+                    route.provider, f"{route.provider} is unavailable, retry later",
+                    retry_after=self.health[route.provider].breaker.retry_after()
+                )
+            self.failovers += 1
+            route = fallback
+        health = self.health[route.provider]
+        llm_settings = route.clamp_settings(llm_settings)
+
+        try:
+            await self.rate_limiter.acquire(route.provider, route.name, estimate_tokens(query, llm_settings))
+        except LLMProviderError:
+            health.breaker.release()
+            raise
+
+        chunks = []
+        try:
+            async with self.provider_semaphores[route.provider]:
+                started = time.monotonic()
+                async for chunk in self._stream_provider(query, route, llm_settings):
+                    chunks.append(chunk)
+                    yield chunk
+        except RateLimitExceeded as ex:
+            # Tokens may already have been sent, so pause the provider but don't retry
+            _record_error(route, ex)
+            self.rate_limiter.backoff(route.provider, route.name, ex.retry_after)
+            health.breaker.release()
+            raise
+        except LLMProviderError as ex:
+            _record_error(route, ex)
+            if _is_provider_fault(ex):
+                health.record(False)
+            health.breaker.release()
+            raise
+        except BaseException:
+            # Client disconnected mid-stream
+            health.breaker.release()
+            raise
+        # Stream durations depend on the answer length, so they don't feed the hedge percentiles
+        llm_request_duration.observe((route.provider, route.name, "stream"), time.monotonic() - started)
+        health.record(True)
+        self.rate_limiter.record_success(route.provider)
+
+        if cache_key is not None:
+            self.response_cache.set(cache_key, "".join(chunks))
+
+    def _stream_provider(self, query: str, route: ModelInfo, llm_settings: Dict) -> AsyncIterator[str]:
+        if self.fake_api is not None:
+            return self.fake_api.stream_async(route.provider, query, route.name, llm_settings)
+        if route.provider == 'atoma':
+            return self.atoma_api.stream_atoma_async(query, route.name, llm_settings)
+        return self.openai_api.stream_openai_async(query, route.name, llm_settings)
     
-    def generate_image(self, query: str, llm_model: str, llm_settings: Dict, system_prompt: Optional[str] = None) -> str:
+    async def generate_image_async(self, query: str, llm_model: str, llm_settings: Dict, system_prompt: Optional[str] = None) -> str:
+        """
+        Non-blocking image generation. At most IMAGE_MAX_CONCURRENCY calls
+        run at once, the rest wait their turn. Raises UnsupportedModelError
+        for models that can't generate images and LLMProviderError if the
+        provider call fails.
+        """
+        route = self.image_route(llm_model)
         if system_prompt:
-            # In a real implementation, we would decrypt and use the system prompt
-            print(f"System prompt: {system_prompt}")
             query = f"{system_prompt}\n user-query: {query}"
 
-        return self.openai_api.generate_image(query, llm_model, llm_settings)
+        await self.rate_limiter.acquire(route.provider, route.name)
+        try:
+            async with self.image_semaphore:
+                started = time.monotonic()
+                if self.fake_api is not None:
+                    response = await self.fake_api.generate_image_async(route.provider, query, route.name, llm_settings)
+                else:
+                    response = await self.openai_api.generate_image_async(query, route.name, llm_settings)
+        except LLMProviderError as ex:
+            _record_error(route, ex)
+            if isinstance(ex, RateLimitExceeded):
+                self.rate_limiter.backoff(route.provider, route.name, ex.retry_after)
+            raise
+        llm_request_duration.observe((route.provider, route.name, "image"), time.monotonic() - started)
+        self.rate_limiter.record_success(route.provider)
+        return response
 # Create a singleton LLM service instance
 llm_service = LLMService()
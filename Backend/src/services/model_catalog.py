@@ -0,0 +1,102 @@
+# model_catalog.py
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from constants import MODEL_CATALOG_CACHE_PATH, MODEL_CATALOG_REFRESH_SECONDS
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
+
+
+class ModelCatalog:
+    """
+    Model names offered by each provider, loaded off the startup path.
+
+    On start the last-known catalog is read from an on-disk cache, then a
+    background task fetches every provider concurrently and refreshes again
+    every `refresh_interval` seconds. A provider that fails or comes back
+    empty keeps its previous list, so the server always answers from the
+    last-known catalog instead of waiting on (or failing with) the remote APIs.
+    """
+    def __init__(self, fetchers: Dict[str, Callable[[], Awaitable[List[str]]]],
+                 cache_path: Optional[str] = MODEL_CATALOG_CACHE_PATH,
+                 refresh_interval: float = MODEL_CATALOG_REFRESH_SECONDS,
+                 on_update: Optional[Callable[[str, List[str]], None]] = None):
+        self.fetchers = fetchers
+        self.on_update = on_update
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.models: Dict[str, List[str]] = {provider: [] for provider in fetchers}
+        self.reported: Set[str] = set()
+        self.refreshed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def load_cached(self):
+        """Seed the catalog from the on-disk cache, if there is one"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as ex:
+            logger.warning("Could not read model catalog cache", extra={"path": self.cache_path, "error": str(ex)})
+            return
+        for provider in self.fetchers:
+            if cached.get(provider):
+                self._set(provider, list(cached[provider]))
+
+    def _set(self, provider: str, names: List[str]):
+        self.models[provider] = names
+        self.reported.add(provider)
+        if self.on_update is not None:
+            self.on_update(provider, names)
+
+    def _save(self, snapshot: Dict[str, List[str]]):
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.cache_path)
+
+    async def refresh(self):
+        """Fetch every provider's models concurrently"""
+        providers = list(self.fetchers)
+        results = await asyncio.gather(
+            *(self.fetchers[provider]() for provider in providers),
+            return_exceptions=True
+        )
+        for provider, result in zip(providers, results):
+            if isinstance(result, BaseException):
+                logger.warning("Could not refresh models, keeping last known list",
+                               extra={"provider": provider, "error": str(result)})
+            elif provider not in self.reported or (result and result != self.models[provider]):
+                # A provider's first answer is reported even when empty
+                self._set(provider, result or self.models[provider])
+
+        if self.cache_path:
+            try:
+                await asyncio.to_thread(self._save, dict(self.models))
+            except OSError as ex:
+                logger.warning("Could not write model catalog cache", extra={"path": self.cache_path, "error": str(ex)})
+        self.refreshed.set()
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Load the cached catalog and start refreshing in the background"""
+        self.load_cached()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
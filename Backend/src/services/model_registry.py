@@ -0,0 +1,121 @@
+# model_registry.py
+import json
+from typing import Dict, List, Optional, Set
+
+from pydantic import BaseModel, ConfigDict
+
+from constants import LOG_SAMPLE_RATE
+from impl import LoggerImpl
+from services.errors import UnsupportedModelError
+
+logger = LoggerImpl(__name__).get_logger()
+
+# Providers in routing priority order, a model offered by both goes to the first
+PROVIDERS = ("atoma", "openai")
+
+# Substrings that identify non-chat models in provider catalogs
+_KIND_MARKERS = (
+    ("dall-e", "image"),
+    ("gpt-image", "image"),
+    ("flux", "image"),
+    ("embedding", "embedding"),
+    ("whisper", "audio"),
+    ("tts", "audio"),
+    ("moderation", "moderation"),
+)
+
+
+class ModelInfo(BaseModel):
+    """Capabilities of one model and the provider that serves it"""
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    provider: str
+    kind: str = "chat"
+    max_tokens: Optional[int] = None
+    streaming: bool = True
+
+    def clamp_settings(self, llm_settings: Optional[Dict]) -> Optional[Dict]:
+        """Settings with max_tokens capped to what the model can produce"""
+        if self.max_tokens is None:
+            return llm_settings
+        requested = (llm_settings or {}).get("max_tokens")
+        if isinstance(requested, int) and requested <= self.max_tokens:
+            return llm_settings
+        return {**(llm_settings or {}), "max_tokens": self.max_tokens}
+
+
+def infer_model_info(name: str, provider: str, max_tokens: Optional[int] = None) -> ModelInfo:
+    lowered = name.lower()
+    kind = next((kind for marker, kind in _KIND_MARKERS if marker in lowered), "chat")
+    return ModelInfo(name=name, provider=provider, kind=kind, max_tokens=max_tokens, streaming=kind == "chat")
+
+
+class ModelRegistry:
+    """
+    Name -> ModelInfo routing table for every provider's models.
+
+    Canonical names and aliases are resolved through one precomputed dict,
+    so routing a request is a single lookup. The table and the serialized
+    `/list_model_names` payload are rebuilt only when a provider's catalog
+    changes, never per request. `loaded` holds the providers whose catalog
+    has been reported at least once.
+    """
+    def __init__(self, default_model: str, aliases: Optional[Dict[str, str]] = None,
+                 max_tokens: Optional[Dict[str, int]] = None):
+        self.default_model = default_model
+        self.aliases = dict(aliases or {})
+        self.max_tokens = dict(max_tokens or {})
+        self.catalogs: Dict[str, List[str]] = {provider: [] for provider in PROVIDERS}
+        self.loaded: Set[str] = set()
+        self.unverified = 0
+        self.unknown = 0
+        self._routes: Dict[str, ModelInfo] = {}
+        self.snapshot = b"{}"
+        self._rebuild()
+
+    def update(self, provider: str, names: List[str]):
+        """Replace a provider's model list and rebuild the routing table"""
+        self.catalogs[provider] = list(names)
+        self.loaded.add(provider)
+        self._rebuild()
+
+    def _rebuild(self):
+        routes: Dict[str, ModelInfo] = {}
+        # Lowest priority first so higher priority providers overwrite
+        for provider in reversed(PROVIDERS):
+            for name in self.catalogs.get(provider, ()):
+                routes[name] = infer_model_info(name, provider, self.max_tokens.get(name))
+        for alias, target in self.aliases.items():
+            if target in routes:
+                routes[alias] = routes[target]
+
+        self._routes = routes
+        self.snapshot = json.dumps(self.catalogs).encode()
+
+    def get(self, name: str) -> Optional[ModelInfo]:
+        return self._routes.get(name)
+
+    def names(self, provider: str) -> List[str]:
+        return self.catalogs.get(provider, [])
+
+    def resolve(self, name: Optional[str]) -> ModelInfo:
+        """
+        Routing decision for a requested model, no name means the default
+        model. A name missing from the table is passed through unchanged to
+        the first provider whose catalog hasn't loaded yet, and raises
+        UnsupportedModelError once every catalog is in.
+        """
+        if not name:
+            return self._routes.get(self.default_model) or infer_model_info(self.default_model, "openai")
+        info = self._routes.get(name)
+        if info is not None:
+            return info
+        pending = next((provider for provider in PROVIDERS if provider not in self.loaded), None)
+        if pending is not None:
+            self.unverified += 1
+            logger.info("Model not in any loaded catalog yet, passing it through",
+                        extra={"model": name, "provider": pending, "sample_rate": LOG_SAMPLE_RATE})
+            return infer_model_info(name, pending, self.max_tokens.get(name))
+        self.unknown += 1
+        raise UnsupportedModelError("registry", f"Unknown model {name}")
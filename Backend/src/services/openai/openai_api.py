@@ -7,6 +7,12 @@ load_dotenv()
 from openai import OpenAI, AsyncOpenAI, models
 
 from constants import DEFAULT_LLM_MODEL, DEFAULT_LLM_SETTINGS, DEFAULT_IMAGE_MODEL, DEFAULT_IMAGE_SETTINGS
+from services.errors import provider_error
+from utils.metrics import record_usage
+
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
 
 class OpenaiAPI:
     def __init__(self):
@@ -15,16 +21,16 @@ class OpenaiAPI:
         if openai_api_key !=None:
             self.openai_client = OpenAI(api_key=openai_api_key)
             self.openai_client_async = AsyncOpenAI(api_key=openai_api_key)
-            
-            print('Initializing openai models list...', end='')
-            self.models_list = self.get_models_list()
-            print('done.')
         else:
-            print('OpenAI API key not found in .env')
+            logger.warning('OpenAI API key not found in .env')
             self.openai_client = None
             self.openai_client_async = None
 
-            self.models_list = []
+    async def aclose(self):
+        """Close the underlying HTTP connection pools"""
+        if self.openai_client is not None:
+            self.openai_client.close()
+            await self.openai_client_async.close()
 
     def get_models_list(self):
         models_list = []
@@ -34,15 +40,20 @@ class OpenaiAPI:
             for model in res.data:
                     models_list.append(model.id)
         except Exception as ex:
-            print(ex)
+            logger.warning("Could not list openai models", extra={"error": str(ex)})
         
         return models_list
 
+    async def get_models_list_async(self):
+        """Fetch the model ids without blocking the event loop"""
+        if self.openai_client_async is None:
+            return []
+        res = await self.openai_client_async.models.list()
+        return [model.id for model in res.data]
     
     def query_openai(self, query, model_name=DEFAULT_LLM_MODEL, llm_settings=DEFAULT_LLM_SETTINGS):
-        print(f"openai: query: {query}, model_name: {model_name}, llm_settings: {llm_settings}")
+        logger.debug("openai chat completion", extra={"model": model_name, "prompt_chars": len(query)})
         try:
-            print(f'one of gpt models. using {model_name} model')
             completion = self.openai_client.chat.completions.create(
                 model=model_name,
                 messages=[
@@ -60,9 +71,8 @@ class OpenaiAPI:
         '''
     
         '''
-        print(f"openai: prompt: {prompt}, model_name: {model_name}, llm_settings: {llm_settings}")
+        logger.debug("openai image generation", extra={"model": model_name, "prompt_chars": len(prompt)})
         try:
-            print(f'Using model: {model_name}')
             response = self.openai_client.images.generate(
                 model=model_name,
                 prompt=prompt,
@@ -72,10 +82,22 @@ class OpenaiAPI:
         except requests.RequestException as e:
             return f"Error: {str(e)}"
     
+    async def generate_image_async(self, prompt="A white siamese cat", model_name=DEFAULT_IMAGE_MODEL, llm_settings=DEFAULT_IMAGE_SETTINGS):
+        logger.debug("openai image generation", extra={"model": model_name, "prompt_chars": len(prompt)})
+        try:
+            response = await self.openai_client_async.images.generate(
+                model=model_name,
+                prompt=prompt,
+                **(llm_settings or {})
+            )
+            return response.data[0].url
+        except Exception as e:
+            logger.warning("openai image generation failed", extra={"model": model_name, "error": str(e)})
+            raise provider_error("openai", f"Error: {str(e)}", e) from e
+    
     async def query_openai_async(self, query, model_name=DEFAULT_LLM_MODEL, llm_settings=DEFAULT_LLM_SETTINGS):
-        print(f"openai: query: {query}, model_name: {model_name}, llm_settings: {llm_settings}")
+        logger.debug("openai chat completion", extra={"model": model_name, "prompt_chars": len(query)})
         try:
-            print(f'Using model: {model_name}')
             completion = await self.openai_client_async.chat.completions.create(
                 model=model_name,
                 messages=[
@@ -84,11 +106,32 @@ class OpenaiAPI:
                 ],
                 **(llm_settings or {})
             )
+            record_usage("openai", model_name, completion.usage)
             # print(completion.choices[0].message.content)
             return completion.choices[0].message.content
         except Exception as e:
-            print(f'Error in query_openai: {e}')
-            return f"Error: {str(e)}"
+            logger.warning("openai chat completion failed", extra={"model": model_name, "error": str(e)})
+            raise provider_error("openai", f"Error: {str(e)}", e) from e
+
+    async def stream_openai_async(self, query, model_name=DEFAULT_LLM_MODEL, llm_settings=DEFAULT_LLM_SETTINGS):
+        """Async generator yielding the completion text as it is produced"""
+        logger.debug("openai chat completion stream", extra={"model": model_name, "prompt_chars": len(query)})
+        try:
+            stream = await self.openai_client_async.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": query}
+                ],
+                stream=True,
+                **(llm_settings or {})
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.warning("openai chat completion stream failed", extra={"model": model_name, "error": str(e)})
+            raise provider_error("openai", f"Error: {str(e)}", e) from e
 
 
 if __name__ == "__main__":
@@ -97,7 +140,7 @@ if __name__ == "__main__":
     openai_api = OpenaiAPI()
     
     # list models
-    print(f'models list: {openai_api.models_list}')
+    print(f'models list: {openai_api.get_models_list()}')
     
     # normal request
     response = openai_api.query_openai_async('hi!','gpt-4-0613')
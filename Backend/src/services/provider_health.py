@@ -0,0 +1,133 @@
+# provider_health.py
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from constants import (
+    CIRCUIT_ERROR_THRESHOLD, CIRCUIT_MIN_CALLS, CIRCUIT_OPEN_SECONDS, CIRCUIT_SLOW_CALL_SECONDS,
+    CIRCUIT_WINDOW, HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, LATENCY_WINDOW
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LatencyWindow:
+    """Latencies (seconds) of the last `size` successful calls"""
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open -> half-open breaker over a sliding window of outcomes.
+
+    A call is a bad outcome when it failed or took longer than
+    `slow_call_seconds`. Once the window holds `min_calls` outcomes and the
+    bad ratio reaches `error_threshold` the circuit opens and calls are
+    refused for `open_seconds`. After that a single probe is let through:
+    success closes the circuit, failure opens it again.
+    """
+    def __init__(self, window: int = CIRCUIT_WINDOW, min_calls: int = CIRCUIT_MIN_CALLS,
+                 error_threshold: float = CIRCUIT_ERROR_THRESHOLD,
+                 slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS):
+        self.outcomes = deque(maxlen=window)
+        self.bad = 0
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_until = 0.0
+        self.probing = False
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now, taking the half-open probe slot if needed"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() < self.opened_until:
+                return False
+            self.state = HALF_OPEN
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def release(self):
+        """The call let through by `allow` was cancelled before it finished"""
+        self.probing = False
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        bad = not ok or (latency is not None and latency > self.slow_call_seconds)
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if bad:
+                self._open()
+            else:
+                self.state = CLOSED
+                self.outcomes.clear()
+                self.bad = 0
+            return
+
+        if len(self.outcomes) == self.outcomes.maxlen:
+            self.bad -= self.outcomes[0]
+        self.outcomes.append(bad)
+        self.bad += bad
+        if (self.state == CLOSED and len(self.outcomes) >= self.min_calls
+                and self.bad / len(self.outcomes) >= self.error_threshold):
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_until = time.monotonic() + self.open_seconds
+        self.opened += 1
+
+
+class ProviderHealth:
+    """Latency percentiles and circuit breaker of one provider"""
+    def __init__(self):
+        self.latencies = LatencyWindow()
+        self.breaker = CircuitBreaker()
+        self.errors = 0
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        """Record a finished call, `latency` only for calls comparable enough to hedge on"""
+        if ok and latency is not None:
+            self.latencies.add(latency)
+        if not ok:
+            self.errors += 1
+        self.breaker.record(ok, latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging a call, None until enough calls were seen"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, self.latencies.percentile(HEDGE_PERCENTILE))
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.breaker.state,
+            "opened": self.breaker.opened,
+            "errors": self.errors,
+            "p50": self.latencies.percentile(50),
+            "p95": self.latencies.percentile(95),
+            "p99": self.latencies.percentile(99),
+        }
@@ -0,0 +1,165 @@
+# rate_limiter.py
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from constants import (
+    MODEL_RATE_LIMITS, PROVIDER_RATE_LIMITS, RATE_LIMIT_BACKOFF_BASE, RATE_LIMIT_BACKOFF_MAX,
+    RATE_LIMIT_MAX_QUEUE, RATE_LIMIT_MAX_WAIT, WORKERS
+)
+from services.errors import ProviderOverloaded, RateLimitExceeded
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute,
+    holding at most one minute's worth.
+
+    `reserve` takes tokens up front and may drive the balance negative; the
+    returned delay is how long the caller has to wait for its share, which
+    queues callers in arrival order without a lock.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens would be available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def reserve(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Limit:
+    """Request and token buckets for one provider or one model"""
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.blocked_until = 0.0
+        self.consecutive_429 = 0
+
+    def delay(self, tokens: float, now: float) -> float:
+        delay = max(0.0, self.blocked_until - now)
+        if self.requests:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def reserve(self, tokens: float):
+        if self.requests:
+            self.requests.reserve(1)
+        if self.tokens:
+            self.tokens.reserve(tokens)
+
+
+class RateLimiter:
+    """
+    Keeps calls under each provider's requests/min and tokens/min quota,
+    plus optional per-model quotas.
+
+    Callers wait for their turn, but never longer than `max_wait` seconds
+    (RateLimitExceeded, served as 429) and never behind more than
+    `max_queue` other callers (ProviderOverloaded, served as 503). When the
+    provider answers 429 anyway, `backoff` pauses the provider for its
+    Retry-After, or for an exponentially growing delay without one.
+    """
+    def __init__(self, provider_limits: Dict[str, Dict] = PROVIDER_RATE_LIMITS,
+                 model_limits: Dict[str, Dict] = MODEL_RATE_LIMITS,
+                 max_wait: float = RATE_LIMIT_MAX_WAIT, max_queue: int = RATE_LIMIT_MAX_QUEUE,
+                 workers: int = WORKERS):
+        self.provider_limits = provider_limits
+        self.model_limits = model_limits
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.workers = workers
+        self._limits: Dict[str, _Limit] = {}
+        self._waiting: Dict[str, int] = {}
+        self.throttled = 0
+        self.rejected = 0
+
+    def _limit(self, key: str, config: Optional[Dict]) -> Optional[_Limit]:
+        limit = self._limits.get(key)
+        if limit is None and config is not None:
+            # Each worker process keeps to its share of the quota
+            rpm, tpm = config.get("rpm"), config.get("tpm")
+            limit = self._limits[key] = _Limit(rpm and rpm / self.workers, tpm and tpm / self.workers)
+        return limit
+
+    def _limits_for(self, provider: str, model: str) -> Tuple[_Limit, ...]:
+        limits = (
+            self._limit(provider, self.provider_limits.get(provider)),
+            self._limit(f"{provider}:{model}", self.model_limits.get(model)),
+        )
+        return tuple(limit for limit in limits if limit is not None)
+
+    async def acquire(self, provider: str, model: str, tokens: float = 0):
+        """Wait until a call of ~`tokens` tokens fits in the quota"""
+        limits = self._limits_for(provider, model)
+        if not limits:
+            return
+
+        now = time.monotonic()
+        delay = max(limit.delay(tokens, now) for limit in limits)
+        if delay > self.max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                provider, f"Rate limit for {model} exceeded, retry in {delay:.1f}s", retry_after=delay
+            )
+        waiting = self._waiting.get(provider, 0)
+        if delay > 0 and waiting >= self.max_queue:
+            self.rejected += 1
+            raise ProviderOverloaded(
+                provider, f"Too many requests queued for {provider}", retry_after=delay
+            )
+
+        # Reserve before sleeping so later callers queue up behind us
+        for limit in limits:
+            limit.reserve(tokens)
+        if delay > 0:
+            self.throttled += 1
+            self._waiting[provider] = waiting + 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._waiting[provider] -= 1
+
+    def backoff(self, provider: str, model: str, retry_after: Optional[float] = None) -> float:
+        """Pause a provider after it answered 429, returns the pause in seconds"""
+        # Providers without a configured quota still get a limit to hold the pause
+        limit = self._limit(provider, self.provider_limits.get(provider) or {})
+        limit.consecutive_429 += 1
+        if retry_after is None:
+            retry_after = min(RATE_LIMIT_BACKOFF_MAX, RATE_LIMIT_BACKOFF_BASE * 2 ** (limit.consecutive_429 - 1))
+        limit.blocked_until = max(limit.blocked_until, time.monotonic() + retry_after)
+        return retry_after
+
+    def record_success(self, provider: str):
+        limit = self._limits.get(provider)
+        if limit is not None:
+            limit.consecutive_429 = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "waiting": sum(self._waiting.values()),
+        }
+
+
+def estimate_tokens(prompt: str, llm_settings: Optional[Dict]) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the output budget"""
+    max_tokens = (llm_settings or {}).get("max_tokens")
+    # Client supplied settings, anything but a non-negative whole number gets the default budget
+    if not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or max_tokens < 0:
+        max_tokens = 1024
+    return len(prompt) // 4 + max_tokens
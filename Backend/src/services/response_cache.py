@@ -0,0 +1,98 @@
+# response_cache.py
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from constants import RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from utils.lru import LRUCache
+from impl import LoggerImpl
+
+logger = LoggerImpl(__name__).get_logger()
+
+
+def request_fingerprint(llm_model: str, llm_settings: Optional[Dict], system_prompt: Optional[str], query: str) -> str:
+    """
+    Stable hash of everything that determines an LLM response.
+
+    Settings are serialized with sorted keys and prompts are stripped, so
+    requests that only differ in key order or surrounding whitespace share
+    a fingerprint.
+    """
+    payload = json.dumps(
+        [llm_model, llm_settings or {}, (system_prompt or "").strip(), query.strip()],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def is_deterministic(llm_settings: Optional[Dict]) -> bool:
+    """Only greedy decoding (temperature 0) gives repeatable answers"""
+    temperature = (llm_settings or {}).get("temperature")
+    if temperature is None:
+        return False
+    try:
+        return float(temperature) == 0.0
+    except (TypeError, ValueError):
+        # Whatever the provider makes of it, it isn't greedy decoding we can rely on
+        return False
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM responses keyed on `request_fingerprint`.
+
+    Responses produced with sampling (temperature > 0) are only served from
+    or stored into the cache when the caller opts in. The cache can be
+    snapshotted to `path` on shutdown and reloaded on startup.
+    """
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 path: Optional[str] = RESPONSE_CACHE_PATH):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self.skipped = 0
+
+    def cacheable(self, llm_settings: Optional[Dict], allow_nondeterministic: bool = False) -> bool:
+        if self.cache.maxsize <= 0:
+            return False
+        if allow_nondeterministic or is_deterministic(llm_settings):
+            return True
+        self.skipped += 1
+        return False
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, response: str):
+        self.cache.set(key, response)
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.cache.stats(), "skipped": self.skipped}
+
+    def load(self):
+        """Restore a snapshot written by `save`, dropping expired entries"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as ex:
+            logger.warning("Could not load response cache", extra={"path": self.path, "error": str(ex)})
+            return
+        now = time.time()
+        for key, response, expires_at in entries:
+            # Skip entries that expired while we were down
+            if expires_at is None or expires_at > now:
+                self.cache.set(key, response, expires_at)
+
+    def save(self):
+        """Write the live entries to disk"""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.cache.items()), f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,47 @@
+# think_filter.py
+
+THINK_END = "</think>"
+
+
+class ThinkTagFilter:
+    """
+    Incrementally strip the reasoning section DeepSeek-R1 models emit before
+    their answer (everything up to and including ``</think>``).
+
+    Chunks are held back until the closing tag shows up, then only the answer
+    is passed through. If the stream ends without a closing tag the held
+    back text is released as is, same as the non-streaming path.
+    """
+    def __init__(self):
+        self._buffer = ""
+        self._in_think = True
+        self._strip_leading = True
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the text that can be shown so far"""
+        if self._in_think:
+            # Only rescan the tail that could hold a tag split across chunks
+            search_from = max(0, len(self._buffer) - len(THINK_END) + 1)
+            self._buffer += chunk
+            end = self._buffer.find(THINK_END, search_from)
+            if end == -1:
+                return ""
+            self._in_think = False
+            chunk = self._buffer[end + len(THINK_END):]
+            self._buffer = ""
+        return self._strip(chunk)
+
+    def flush(self) -> str:
+        """Return whatever is still held back once the stream has ended"""
+        if not self._in_think:
+            return ""
+        self._in_think = False
+        text, self._buffer = self._buffer, ""
+        return self._strip(text)
+
+    def _strip(self, text: str) -> str:
+        # Drop the whitespace between the closing tag and the answer
+        if self._strip_leading:
+            text = text.lstrip()
+            self._strip_leading = not text
+        return text
@@ -0,0 +1,8 @@
+from .cursor import decode_cursor, encode_cursor
+from .fast_json import FastJSONResponse
+from .lru import LRUCache
+from .metrics import MetricsRegistry, metrics
+from .singleflight import SingleFlight
+from .text import tokenize
+
+__all__ = ["decode_cursor", "encode_cursor", "FastJSONResponse", "LRUCache", "MetricsRegistry", "metrics", "SingleFlight", "tokenize"]
@@ -0,0 +1,40 @@
+# cursor.py
+import base64
+import json
+from typing import Any, List
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack keyset pagination values into an opaque, url-safe cursor string"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_instance(value: Any, expected: type) -> bool:
+    # bool is an int subclass but never a valid key, ints are fine where floats are
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """
+    Unpack a cursor created by `encode_cursor`. With `types`, the cursor
+    must hold exactly one value of each type, in that order.
+
+    Raises ValueError if the cursor was not produced by `encode_cursor`
+    (with values of those types).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if types and (len(values) != len(types)
+                  or not all(_is_instance(value, expected) for value, expected in zip(values, types))):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
@@ -0,0 +1,48 @@
+# fast_json.py
+"""
+JSON encoding for API responses with orjson, which also embeds
+already-serialized JSON (stored columns, pydantic's own output) as
+orjson.Fragment without parsing it again.
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def loads(text: str) -> Any:
+    return orjson.loads(text)
+
+
+def raw_json(text: Optional[str]) -> Any:
+    """
+    A stored JSON document (e.g. a TEXT column) for a response body, passed
+    through as is. Only for values that go straight to `dumps`, never into
+    a model.
+    """
+    if not text:
+        return None
+    return orjson.Fragment(text)
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # pydantic serializes its models faster than a dict round trip would
+        return orjson.Fragment(obj.model_dump_json())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with `dumps`. The app's default response class;
+    endpoints return it directly for data that is trusted already (database
+    objects), which skips FastAPI's response_model validation and encoding
+    pass. The response_model is still used for the OpenAPI schema.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
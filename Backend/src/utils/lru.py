@@ -0,0 +1,94 @@
+# lru.py
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Size bounded LRU mapping with an optional per-entry TTL.
+
+    Entries store their absolute expiry (wall clock) so they can be
+    persisted and reloaded across restarts. With `max_bytes`, entries are
+    also weighed by `sizeof` and the least recently used ones are evicted
+    once their total goes over it; a single entry heavier than that is not
+    cached at all. Hits, misses and evictions are counted for reporting.
+    """
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            if size > self.max_bytes:
+                self._remove(key)
+                return
+            self.bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._data.pop(key, None)
+        self.bytes -= self._sizes.pop(key, 0)
+        return entry
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._remove(key)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def items(self) -> Iterator[Tuple[Hashable, Any, Optional[float]]]:
+        """Iterate over live entries as (key, value, expires_at), oldest first"""
+        now = time.time()
+        for key, (value, expires_at) in list(self._data.items()):
+            if expires_at is None or expires_at > now:
+                yield key, value, expires_at
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
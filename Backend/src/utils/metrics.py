@@ -0,0 +1,164 @@
+# metrics.py
+import bisect
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds, from sub-millisecond DB reads to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Bucketed distribution per label combination.
+
+    Each series is a flat list of per-bucket counts plus sum and count,
+    allocated the first time a label combination is seen; observing is a
+    bisect and two additions. Buckets are only made cumulative on render.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {_format_value(cumulative)}"
+
+
+class CallbackMetric:
+    """
+    Gauge or counter read at scrape time from `collect`, which returns
+    {labels: value}. Used to expose stats that components already keep.
+    """
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...],
+                 collect: Callable[[], Dict[Labels, float]], kind: str = "gauge"):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        for labels, value in self.collect().items():
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format.
+
+    Metrics are only updated from the event loop thread (database timings
+    are recorded when the executor hands the result back), so plain dict
+    updates are safe without locks.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, labels: Tuple[str, ...],
+                 collect: Callable[[], Dict[Labels, float]], kind: str = "gauge") -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, labels, collect, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+llm_request_duration = metrics.histogram(
+    "llm_request_duration_seconds", "Upstream LLM call latency", ("provider", "model", "operation")
+)
+llm_request_errors = metrics.counter(
+    "llm_request_errors_total", "Failed upstream LLM calls", ("provider", "model", "status")
+)
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "Tokens reported by the providers", ("provider", "model", "type")
+)
+db_operation_duration = metrics.histogram(
+    "db_operation_duration_seconds", "Database operation latency", ("operation",)
+)
+
+
+
+def record_usage(provider: str, model: str, usage):
+    """Count the prompt/completion tokens of a completion's `usage`, if the provider sent one"""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            llm_tokens.inc((provider, model, kind), tokens)
@@ -0,0 +1,64 @@
+# singleflight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it is still running await that same task and get its result (or
+    its exception). The task is shielded, so a caller that disconnects does
+    not cancel the call for everyone else; it is only cancelled once the
+    last caller waiting on it has gone.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.future.add_done_callback(lambda done: self._forget(key, done))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            # Only reached with the call still running when every waiter was cancelled
+            if flight.waiters == 0 and not flight.future.done():
+                flight.future.cancel()
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        flight = self._inflight.get(key)
+        if flight is not None and flight.future is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._inflight),
+            # Average number of callers served by one upstream call
+            "fan_in_ratio": self.calls / self.executions if self.executions else 0.0,
+        }
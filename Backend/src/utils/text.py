@@ -0,0 +1,12 @@
+# text.py
+import re
+from typing import List
+
+# Letters and digits only, which matches how the FTS5 unicode61 tokenizer
+# splits text (underscores and punctuation are separators).
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms"""
+    return _TOKEN_RE.findall(text.lower())
@@ -0,0 +1,41 @@
+# conftest.py
+import os
+
+# config.py reads the environment on import, so this runs before any app module is loaded
+os.environ.update({
+    "USE_SQLITE": "False",
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_LATENCY": "fixed:0",
+    "MODEL_CATALOG_CACHE_PATH": "",
+    "RESPONSE_CACHE_PATH": "",
+    "LOG_LEVEL": "WARNING",
+})
+
+import pytest
+
+import database.db as db_module
+from database.db import InMemoryDatabase, SQLiteDatabase
+
+
+@pytest.fixture
+def sqlite_path(tmp_path, monkeypatch):
+    """A fresh SQLite file that SQLiteDatabase() opens"""
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(db_module, "SQLITE_DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def sqlite_db(sqlite_path):
+    database = SQLiteDatabase()
+    yield database
+    database.close()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request):
+    """Each backend in turn, so both are held to the same behavior"""
+    if request.param == "memory":
+        yield InMemoryDatabase()
+    else:
+        yield request.getfixturevalue("sqlite_db")
@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import router.bulk_endpoints as bulk_endpoints
+from main import app
+from models.schemas import Content, Purchase
+from services.bulk import NDJSONImport
+
+
+def _ids(page):
+    return [result["id"] for result in page.results]
+
+
+def test_duplicate_id_in_one_chunk(backend):
+    # The last listing of an id wins and is indexed once
+    assert backend.bulk_add_content([
+        Content(id="dup", title="Haiku writer", description="first"),
+        Content(id="other", title="Sonnet writer", description="other"),
+        Content(id="dup", title="Limerick writer", description="second"),
+    ]) == 3
+
+    assert backend.get_content("dup").title == "Limerick writer"
+    assert _ids(backend.search_content("limerick", 10, None, ["id"])) == ["dup"]
+    assert _ids(backend.search_content("haiku", 10, None, ["id"])) == []
+    assert sorted(_ids(backend.search_content("writer", 10, None, ["id"]))) == ["dup", "other"]
+    if hasattr(backend, "pool"):
+        with backend.pool.connection() as conn:
+            conn.execute("INSERT INTO content_fts (content_fts) VALUES ('integrity-check')")
+
+
+def test_replace_across_chunks(backend):
+    backend.bulk_add_content([Content(id=f"c{i}", title=f"Haiku writer {i}", description="") for i in range(5)])
+    backend.bulk_add_content([Content(id="c2", title="Sonnet writer", description="replaced")])
+
+    assert _ids(backend.search_content("sonnet", 10, None, ["id"])) == ["c2"]
+    assert "c2" not in _ids(backend.search_content("haiku", 10, None, ["id"]))
+    exported = [content for batch in backend.iter_content(2) for content in batch]
+    assert sorted(content.id for content in exported) == [f"c{i}" for i in range(5)]
+
+
+def test_ids_assigned_and_exported(backend):
+    contents = [Content(title=f"Untitled {i}", description="") for i in range(3)]
+    assert backend.bulk_add_content(contents) == 3
+    assert all(content.id for content in contents)
+    assert backend.bulk_add_content([]) == 0
+
+    exported = [content for batch in backend.iter_content(2) for content in batch]
+    assert [content.id for content in exported] == [content.id for content in contents]
+
+
+def test_bulk_purchases_skip_existing(backend):
+    backend.add_purchase(Purchase(user_id="alice", content_id="c1"))
+    added = backend.bulk_add_purchases([
+        Purchase(user_id="alice", content_id="c1"),
+        Purchase(id=10, user_id="bob", content_id="c1"),
+        Purchase(id=10, user_id="carol", content_id="c1"),
+        Purchase(user_id="bob", content_id="c2"),
+        Purchase(user_id="bob", content_id="c2"),
+    ])
+    assert added == 2
+    assert sorted(p.content_id for p in backend.get_purchases_by_user("bob")) == ["c1", "c2"]
+    assert backend.get_purchases_by_user("carol") == []
+
+
+def test_ndjson_import_reports_bad_lines():
+    importer = NDJSONImport(Content, chunk_size=2)
+    lines = [
+        b'{"title": "a", "description": "a"}',
+        b'{"title": "b"}',
+        b"",
+        b'{"title": "c", "description": "c"}',
+        b"not json",
+        b'{"title": "d", "description": "d"}',
+    ]
+    batches = [batch for batch in map(importer.feed, lines) if batch]
+    batches.append(importer.finish())
+
+    assert [[content.title for content in batch] for batch in batches] == [["a", "c"], ["d"]]
+    assert importer.failed == 2
+    assert [error["lines"] for error in importer.errors] == ["2", "5"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(bulk_endpoints, "BULK_API_TOKEN", "secret")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_bulk_api_import_then_search(client):
+    body = "\n".join([
+        '{"id": "api-dup", "title": "Ballad writer", "description": "first"}',
+        '{"id": "api-dup", "title": "Ballad composer", "description": "second"}',
+        '{"title": "no description"}',
+    ])
+    response = client.post("/api/v1/bulk/content", content=body, headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+    assert response.json()["failed"] == 1
+
+    results = client.post("/api/v1/content/search", json={"query": "ballad"}).json()["results"]
+    assert [(result["id"], result["title"]) for result in results] == [("api-dup", "Ballad composer")]
+
+
+def test_bulk_api_needs_token(client):
+    assert client.get("/api/v1/bulk/content").status_code == 401
+    assert client.get("/api/v1/bulk/content", headers={"Authorization": "Bearer wrong"}).status_code == 401
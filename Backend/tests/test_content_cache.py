@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+from database.async_db import AsyncDatabase
+from database.db import InMemoryDatabase, SQLiteDatabase
+from models.schemas import Content
+
+
+class CountingBackend(InMemoryDatabase):
+    """In-memory backend that counts get_content calls"""
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_content(self, content_id):
+        self.reads += 1
+        return super().get_content(content_id)
+
+
+def test_reads_are_cached():
+    database = AsyncDatabase(CountingBackend)
+
+    async def scenario():
+        await database.add_content(Content(id="c1", title="Haiku writer", description=""))
+        first = await database.get_content("c1")
+        second = await database.get_content("c1")
+        assert first.title == second.title == "Haiku writer"
+        assert database.backend.reads == 1
+        assert await database.get_content("missing") is None
+        assert await database.get_content("missing") is None
+        # Misses aren't cached, the listing may be added later
+        assert database.backend.reads == 3
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("write", ["add_content", "bulk_add_content"])
+def test_write_invalidates(write):
+    database = AsyncDatabase(CountingBackend)
+
+    async def scenario():
+        await database.add_content(Content(id="c1", title="Haiku writer", description=""))
+        assert (await database.get_content("c1")).title == "Haiku writer"
+
+        updated = Content(id="c1", title="Sonnet writer", description="")
+        if write == "add_content":
+            await database.add_content(updated)
+        else:
+            await database.bulk_add_content([updated])
+        assert (await database.get_content("c1")).title == "Sonnet writer"
+        assert database.backend.reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_bulk_write_still_invalidates():
+    class FailingBackend(CountingBackend):
+        def bulk_add_content(self, contents):
+            # Part of the batch made it in before the error
+            self.content[contents[0].id] = contents[0]
+            raise RuntimeError("disk full")
+
+    database = AsyncDatabase(FailingBackend)
+
+    async def scenario():
+        await database.add_content(Content(id="c1", title="Haiku writer", description=""))
+        await database.get_content("c1")
+        with pytest.raises(RuntimeError):
+            await database.bulk_add_content([Content(id="c1", title="Sonnet writer", description="")])
+        assert (await database.get_content("c1")).title == "Sonnet writer"
+
+    asyncio.run(scenario())
+
+
+def test_read_racing_a_write_is_not_cached(sqlite_path):
+    reading = threading.Event()
+    release = threading.Event()
+
+    class SlowReadBackend(SQLiteDatabase):
+        slow = False
+
+        def get_content(self, content_id):
+            content = super().get_content(content_id)
+            if self.slow:
+                # Hold on to the old row until the write below has committed
+                reading.set()
+                release.wait(5)
+            return content
+
+    database = AsyncDatabase(SlowReadBackend, max_workers=2)
+
+    async def scenario():
+        await database.add_content(Content(id="c1", title="Haiku writer", description=""))
+        database.backend.slow = True
+        read = asyncio.create_task(database.get_content("c1"))
+        await asyncio.to_thread(reading.wait, 5)
+        try:
+            await database.bulk_add_content([Content(id="c1", title="Sonnet writer", description="")])
+        finally:
+            release.set()
+        assert (await read).title == "Haiku writer"
+        database.backend.slow = False
+        assert (await database.get_content("c1")).title == "Sonnet writer"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        database.close()
+
+
+def test_cache_disabled():
+    database = AsyncDatabase(CountingBackend, content_cache_size=0)
+
+    async def scenario():
+        await database.add_content(Content(id="c1", title="Haiku writer", description=""))
+        await database.get_content("c1")
+        await database.get_content("c1")
+        assert database.backend.reads == 2
+
+    asyncio.run(scenario())
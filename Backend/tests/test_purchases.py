@@ -0,0 +1,81 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database.db import SQLiteDatabase
+from database.errors import AlreadyPurchasedError, ContentNotFoundError, UserNotFoundError
+from models.schemas import Content, Purchase, User
+
+
+def _seed(database):
+    database.add_user(User(id="alice", username="alice"))
+    database.add_content(Content(id="c1", title="Haiku writer", description="Writes haiku"))
+
+
+def test_purchase_if_not_owned_refusals(backend):
+    _seed(backend)
+    purchase = backend.purchase_if_not_owned(Purchase(user_id="alice", content_id="c1"))
+    assert purchase.id is not None
+    assert backend.has_purchased("alice", "c1")
+
+    with pytest.raises(AlreadyPurchasedError):
+        backend.purchase_if_not_owned(Purchase(user_id="alice", content_id="c1"))
+    with pytest.raises(ContentNotFoundError):
+        backend.purchase_if_not_owned(Purchase(user_id="alice", content_id="missing"))
+    with pytest.raises(UserNotFoundError):
+        backend.purchase_if_not_owned(Purchase(user_id="bob", content_id="c1"))
+    assert [p.id for p in backend.get_purchases_by_user("alice")] == [purchase.id]
+
+
+def test_add_purchase_refuses_duplicate_pair(backend):
+    first = backend.add_purchase(Purchase(user_id="alice", content_id="c1"))
+    with pytest.raises(AlreadyPurchasedError):
+        backend.add_purchase(Purchase(user_id="alice", content_id="c1"))
+    assert [p.id for p in backend.get_purchases_by_user("alice")] == [first.id]
+
+
+def test_concurrent_purchases_record_one(sqlite_db):
+    _seed(sqlite_db)
+
+    def attempt(_):
+        try:
+            return sqlite_db.purchase_if_not_owned(Purchase(user_id="alice", content_id="c1"))
+        except AlreadyPurchasedError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(attempt, range(64)))
+
+    assert len([purchase for purchase in results if purchase is not None]) == 1
+    assert len(sqlite_db.get_purchases_by_user("alice")) == 1
+
+
+def test_duplicate_purchases_removed_on_open(sqlite_path):
+    # A database from before the unique (user_id, content_id) index
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute(
+        "CREATE TABLE purchases (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, content_id TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO purchases (user_id, content_id) VALUES (?, ?)",
+        [("alice", "c1"), ("alice", "c1"), ("bob", "c1"), ("alice", "c2"), ("alice", "c1")]
+    )
+    conn.commit()
+    conn.close()
+
+    database = SQLiteDatabase()
+    try:
+        assert [(p.id, p.content_id) for p in database.get_purchases_by_user("alice")] == [(1, "c1"), (4, "c2")]
+        assert [p.id for p in database.get_purchases_by_user("bob")] == [3]
+        with pytest.raises(AlreadyPurchasedError):
+            database.add_purchase(Purchase(user_id="alice", content_id="c1"))
+    finally:
+        database.close()
+
+    # Opening again finds the index and leaves the purchases alone
+    database = SQLiteDatabase()
+    try:
+        assert len(database.get_purchases_by_user("alice")) == 2
+    finally:
+        database.close()
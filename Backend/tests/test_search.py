@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from database.db import SQLiteDatabase
+from models.schemas import Content
+
+
+def _seed(database, count=23):
+    database.bulk_add_content([
+        Content(
+            id=f"c{i}",
+            title=f"Haiku writer {i}" if i % 3 else f"Sonnet writer {i}",
+            description="Writes short poems " * (1 + i % 4)
+        )
+        for i in range(count)
+    ])
+
+
+def _walk(database, query, limit, cursor=None):
+    """Ids of every result from `cursor` on, one page at a time"""
+    ids = []
+    while True:
+        page = database.search_content(query, limit, cursor, ["id"])
+        ids.extend(result["id"] for result in page.results)
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("query", ["", "writer", "haiku", "poem"])
+@pytest.mark.parametrize("limit", [1, 4, 50])
+def test_cursor_round_trip(backend, query, limit):
+    _seed(backend)
+    everything = [result["id"] for result in backend.search_content(query, 100, None, ["id"]).results]
+    assert everything
+    assert _walk(backend, query, limit) == everything
+
+
+def test_no_match(backend):
+    _seed(backend)
+    page = backend.search_content("limerick", 10)
+    assert page.results == []
+    assert page.next_cursor is None
+
+
+def test_cursor_sees_content_added_later(backend):
+    _seed(backend, count=6)
+    first = backend.search_content("", 3, None, ["id"])
+    backend.add_content(Content(id="c6", title="Haiku writer 6", description="Added between pages"))
+    assert [result["id"] for result in first.results] == ["c0", "c1", "c2"]
+    assert _walk(backend, "", 3, first.next_cursor) == ["c3", "c4", "c5", "c6"]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "WzEsMiwzXQ", "WyJhIiwxXQ"])
+def test_invalid_cursor(backend, cursor):
+    _seed(backend, count=3)
+    with pytest.raises(ValueError):
+        backend.search_content("writer", 2, cursor)
+
+
+def test_seq_migration_keeps_rowids(sqlite_path):
+    # A content table keyed on id alone, as created before the seq column
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute('''
+    CREATE TABLE content (
+        id TEXT PRIMARY KEY, title TEXT, description TEXT, llm_model TEXT,
+        llm_settings TEXT, price REAL, system_prompt TEXT, metadata TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE VIRTUAL TABLE content_fts USING fts5(
+        title, description, content='content', content_rowid='rowid'
+    )
+    ''')
+    conn.executemany(
+        "INSERT INTO content (id, title, description, llm_settings) VALUES (?, ?, ?, '{}')",
+        [(f"c{i}", f"Haiku writer {i}", "Writes short poems") for i in range(8)]
+    )
+    conn.execute("DELETE FROM content WHERE id = 'c3'")
+    rowids = conn.execute("SELECT rowid, id FROM content ORDER BY rowid").fetchall()
+    conn.commit()
+    conn.close()
+
+    database = SQLiteDatabase()
+    try:
+        with database.pool.connection() as conn:
+            assert conn.execute("SELECT seq, id FROM content ORDER BY seq").fetchall() == rowids
+            # Raises if the index no longer matches the table
+            conn.execute("INSERT INTO content_fts (content_fts) VALUES ('integrity-check')")
+        assert _walk(database, "haiku", 3) == [content_id for _, content_id in rowids]
+        database.add_content(Content(id="c9", title="Haiku writer 9", description="New"))
+        assert sorted(_walk(database, "haiku", 3)) == sorted([content_id for _, content_id in rowids] + ["c9"])
+    finally:
+        database.close()